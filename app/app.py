@@ -22,6 +22,10 @@ class WeatherApp:
         self.controller = Controller(self.app, self.model)
         self.app.layout = self.view.create_layout()
         self.register_callbacks()
+        self.register_routes()
+
+        if self.model.parser.contour_settings["mode"] == "raster":
+            self.model.tile_renderer.start_background()
 
     def register_callbacks(self):
         """
@@ -29,6 +33,13 @@ class WeatherApp:
         """
         self.controller.register_callbacks()
 
+    def register_routes(self):
+        """
+        Method for registering HTTP endpoints and response compression.
+        """
+        self.controller.register_routes()
+        self.controller.register_compression()
+
     def run(self, debug=False):
         """
         Run the application.
@@ -0,0 +1,64 @@
+"""
+Module for measuring bytes transferred before the first paint of the dashboard:
+the index page, its scripts and stylesheets, the layout and the callback dependencies.
+
+Usage: python3 -m benchmarks.first_paint
+"""
+
+import re
+from app import WeatherApp
+from controller.compression import brotli
+
+RESOURCE_PATTERN = re.compile(r'<script src="([^"]+)"|<link rel="stylesheet" href="([^"]+)"')
+
+
+def first_paint_paths(client):
+    """
+    Return paths of all resources requested by the browser before the first paint.
+    """
+
+    index = client.get("/", headers={"Accept-Encoding": "identity"}).get_data(as_text=True)
+    resources = [script or stylesheet for script, stylesheet in RESOURCE_PATTERN.findall(index)]
+
+    return ["/"] + resources + ["/_dash-layout", "/_dash-dependencies"]
+
+
+def measure(client, paths, encoding, etags=None):
+    """
+    Request all paths with the encoding and return transferred bytes per path and ETags of the responses.
+    If ETags of a previous visit are given, they are sent for revalidation.
+    """
+
+    sizes, new_etags = {}, {}
+    for path in paths:
+        headers = {"Accept-Encoding": encoding}
+        if etags and etags.get(path):
+            headers["If-None-Match"] = etags[path]
+        response = client.get(path, headers=headers)
+        sizes[path] = len(response.data)
+        new_etags[path] = response.headers.get("ETag")
+
+    return sizes, new_etags
+
+
+def main():
+    """
+    Print bytes of the first paint uncompressed (as before), compressed, and of a repeated visit revalidated with ETags.
+    """
+
+    client = WeatherApp().app.server.test_client()
+    paths = first_paint_paths(client)
+    encoding = "br, gzip" if brotli is not None else "gzip"
+
+    plain, _ = measure(client, paths, "identity")
+    compressed, etags = measure(client, paths, encoding)
+    repeated, _ = measure(client, paths, encoding, etags)
+
+    print(f"{'resource':<60}{'plain':>12}{'compressed':>12}{'repeated':>12}")
+    for path in paths:
+        print(f"{path.split('?')[0][-60:]:<60}{plain[path]:>12}{compressed[path]:>12}{repeated[path]:>12}")
+    print(f"{'total':<60}{sum(plain.values()):>12}{sum(compressed.values()):>12}{sum(repeated.values()):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Module for load testing the WeatherApp with concurrent simulated dashboard sessions.
+
+Usage: python3 -m benchmarks.loadtest --concurrency 1 4 16 --workers threads processes:4 --duration 20
+"""
+
+import argparse
+import logging
+import multiprocessing
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+
+def parse_outputs(output):
+    """
+    Parse the output string of Dash dependency into the list of {"id", "property"} dictionaries.
+    """
+
+    if output.startswith(".."):
+        outputs = output[2:-2].split("...")
+    else:
+        outputs = [output]
+
+    return [dict(zip(("id", "property"), item.rsplit(".", 1))) for item in outputs]
+
+
+def layout_values(component, values=None):
+    """
+    Walk the serialized Dash layout and collect the "value" property of all components with id.
+    """
+
+    values = {} if values is None else values
+
+    if isinstance(component, list):
+        for child in component:
+            layout_values(child, values)
+    elif isinstance(component, dict):
+        props = component.get("props", {})
+        if "id" in props and "value" in props:
+            values[props["id"]] = props["value"]
+        layout_values(props.get("children"), values)
+
+    return values
+
+
+class SessionScript:
+    """
+    Generate realistic sequences of callback requests of one dashboard user.
+    """
+
+    def __init__(self, dependencies, values, seed=None):
+        """
+        Assign the callback dependencies and initial input values taken from the layout.
+        """
+
+        self.dependencies = dependencies
+        self.values = dict(values)
+        self.random = random.Random(seed)
+
+    def payloads(self, changed_id):
+        """
+        Return request bodies of all callbacks triggered by the change of the component value.
+        """
+
+        payloads = []
+        for dependency in self.dependencies:
+            if dependency.get("clientside_function"):
+                continue
+            if changed_id not in [item["id"] for item in dependency["inputs"]]:
+                continue
+
+            outputs = parse_outputs(dependency["output"])
+            payloads.append({
+                "output": dependency["output"],
+                "outputs": outputs if len(outputs) > 1 else outputs[0],
+                "inputs": [dict(item, value=self.values.get(item["id"])) for item in dependency["inputs"]],
+                "changedPropIds": [f"{changed_id}.value"],
+                "state": [dict(item, value=self.values.get(item["id"])) for item in dependency["state"]]
+            })
+
+        return payloads
+
+    def action(self, n_times, n_quantities, n_stations):
+        """
+        Pick the next user action and return the list of request bodies it causes.
+        Slider drags produce a burst of consecutive time steps.
+        """
+
+        kind = self.random.choices(["drag", "quantity", "model", "station"], weights=[4, 2, 1, 2])[0]
+
+        if kind == "drag":
+            start = self.values.get("slider-time", 0)
+            end = self.random.randrange(n_times)
+            step = 1 if end >= start else -1
+            payloads = []
+            for value in range(start + step, end + step, step):
+                self.values["slider-time"] = value
+                payloads.extend(self.payloads("slider-time"))
+            return payloads
+
+        if kind == "quantity":
+            self.values["dropdown-quantity"] = self.random.randrange(n_quantities)
+            return self.payloads("dropdown-quantity")
+
+        if kind == "model":
+            self.values["radio-items-model"] = self.random.randrange(3)
+            return self.payloads("radio-items-model")
+
+        self.values["dropdown-station"] = self.random.randrange(n_stations)
+        return self.payloads("dropdown-station")
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Return throughput, p50 and p99 latency in milliseconds and error rate of the measured requests.
+    """
+
+    total = len(latencies) + errors
+    latencies = np.asarray(latencies) * 1000
+
+    return {
+        "requests": total,
+        "throughput": total / elapsed if elapsed > 0 else 0.0,
+        "p50": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+        "p99": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "error_rate": errors / total if total else 0.0
+    }
+
+
+def run_session(url, dependencies, values, dimensions, deadline, seed):
+    """
+    Replay one session until the deadline. Return latencies of successful requests and number of errors.
+    """
+
+    script = SessionScript(dependencies, values, seed)
+    latencies = []
+    errors = 0
+
+    with requests.Session() as session:
+        while time.perf_counter() < deadline:
+            for payload in script.action(*dimensions):
+                start = time.perf_counter()
+                try:
+                    response = session.post(f"{url}/_dash-update-component", json=payload, timeout=60)
+                    if response.status_code in (200, 204):
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+                except requests.RequestException:
+                    errors += 1
+
+    return latencies, errors
+
+
+def run_load(url, concurrency, duration, dimensions):
+    """
+    Run concurrent sessions against the server for the given duration and return the summary.
+    """
+
+    dependencies = requests.get(f"{url}/_dash-dependencies", timeout=60).json()
+    values = layout_values(requests.get(f"{url}/_dash-layout", timeout=60).json())
+
+    start = time.perf_counter()
+    deadline = start + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(run_session, url, dependencies, values, dimensions, deadline, seed)
+            for seed in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result[0]]
+    return summarize(latencies, sum(result[1] for result in results), elapsed)
+
+
+def serve(fd, threaded):
+    """
+    Run one worker of the WeatherApp server accepting connections on the shared listening socket.
+    """
+
+    from app import WeatherApp
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    make_server("127.0.0.1", 0, WeatherApp().app.server, threaded=threaded, fd=fd).serve_forever()
+
+
+def start_workers(port, threaded, processes):
+    """
+    Pre-fork the worker processes of the server sharing one listening socket and return the socket and the workers.
+    Every worker lives for the whole measurement, so its caches stay warm like in a production pre-forked server.
+    """
+
+    listener = socket.create_server(("127.0.0.1", port), backlog=128)
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=serve, args=(listener.fileno(), threaded), daemon=True)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    return listener, workers
+
+
+def parse_workers(workers):
+    """
+    Parse worker configuration "threads" (one worker with a thread per request)
+    or "processes:N" (N pre-forked single threaded workers) into (threaded, processes).
+    """
+
+    if workers == "threads":
+        return True, 1
+
+    kind, _, count = workers.partition(":")
+    if kind == "processes" and count.isdigit() and int(count) > 0:
+        return False, int(count)
+
+    raise ValueError(f"Invalid worker configuration: {workers}")
+
+
+def wait_for_server(url, timeout=120):
+    """
+    Wait until the server answers the layout request.
+    """
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(f"{url}/_dash-layout", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+
+    raise TimeoutError(f"Server at {url} did not start in {timeout} seconds.")
+
+
+def main():
+    """
+    Measure the server for all combinations of worker configurations and concurrency levels.
+    """
+
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    argument_parser.add_argument("--workers", nargs="+", default=["threads", "processes:4"])
+    argument_parser.add_argument("--duration", type=float, default=20.0)
+    argument_parser.add_argument("--port", type=int, default=8050)
+    args = argument_parser.parse_args()
+
+    from model.model import Model
+
+    model = Model()
+    dimensions = (model.forecast_times(), len(model.parser.quantities), len(model.stations_pos))
+
+    print(f"{'workers':<14}{'sessions':>9}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for workers in args.workers:
+        threaded, processes = parse_workers(workers)
+        listener, server_workers = start_workers(args.port, threaded, processes)
+        url = f"http://127.0.0.1:{args.port}"
+
+        try:
+            wait_for_server(url)
+            for concurrency in args.concurrency:
+                result = run_load(url, concurrency, args.duration, dimensions)
+                print(
+                    f"{workers:<14}{concurrency:>9}{result['requests']:>10}{result['throughput']:>9.1f}"
+                    f"{result['p50']:>9.1f}{result['p99']:>9.1f}{result['error_rate']:>8.1%}"
+                )
+        finally:
+            for worker in server_workers:
+                worker.terminate()
+            for worker in server_workers:
+                worker.join()
+            listener.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Module for measuring grid throughput for combinations of worker processes and per-worker thread limits.
+
+Usage: python3 -m benchmarks.threads --workers 1 2 4 --threads 1 2 4 --duration 10
+"""
+
+import argparse
+import multiprocessing
+import time
+
+
+def work(ex_model, threads, duration, barrier, counter):
+    """
+    Worker process: fit and predict planes of random slices with the given thread limits until the duration passes.
+    """
+
+    import numpy as np
+    from model.model import Model
+
+    model = Model()
+    model.parser.thread_settings = {"blas_threads": threads, "openmp_threads": threads, "knn_n_jobs": threads}
+    model.apply_thread_limits()
+    xrange, yrange = model.build_range()
+    rng = np.random.default_rng()
+
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    grids = 0
+    while time.perf_counter() < deadline:
+        model.clear_cache()
+        model.calc_grid(xrange, yrange, int(rng.integers(model.forecast_times())), int(rng.integers(model.data.shape[2])), ex_model)
+        grids += 1
+
+    with counter.get_lock():
+        counter.value += grids
+
+
+def measure(ex_model, workers, threads, duration):
+    """
+    Run the workers in parallel, start measuring when all of them are initialized, and return the number of planes calculated per second.
+    """
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers + 1)
+    counter = context.Value("i", 0)
+    processes = [
+        context.Process(target=work, args=(ex_model, threads, duration, barrier, counter))
+        for _ in range(workers)
+    ]
+
+    for process in processes:
+        process.start()
+    barrier.wait()
+    for process in processes:
+        process.join()
+
+    return counter.value / duration
+
+
+def main():
+    """
+    Print throughput of every combination of workers and threads for the selected models.
+    """
+
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    argument_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    argument_parser.add_argument("--models", type=int, nargs="+", default=[0, 1, 2])
+    argument_parser.add_argument("--duration", type=float, default=10.0)
+    args = argument_parser.parse_args()
+
+    print(f"cores: {multiprocessing.cpu_count()}")
+    print(f"{'model':<7}{'workers':>8}{'threads':>8}{'grids/s':>10}")
+    for ex_model in args.models:
+        for workers in args.workers:
+            for threads in args.threads:
+                throughput = measure(ex_model, workers, threads, args.duration)
+                print(f"{['kNN', 'SVR', 'GBR'][ex_model]:<7}{workers:>8}{threads:>8}{throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
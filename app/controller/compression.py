@@ -0,0 +1,198 @@
+"""
+Module for compressing HTTP responses and caching the static ones with ETags.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app, g, request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+CACHEABLE_PATHS = ("/", "/_dash-layout", "/_dash-dependencies")
+
+CACHEABLE_PREFIXES = ("/assets/", "/_dash-component-suites/")
+
+MAX_CACHED_ASSETS = 256
+
+
+class CachedBody:
+    """
+    Body of a static response with its ETag and compressed variants, which are created on first request.
+    """
+
+    def __init__(self, body, mimetype, content_type, cache_control):
+        self.body = body
+        self.mimetype = mimetype
+        self.content_type = content_type
+        self.cache_control = cache_control or "no-cache"
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: body}
+
+    def variant_etag(self, encoding):
+        """
+        Return ETag of the body in the encoding, every encoding is a different representation with its own strong ETag.
+        """
+
+        return self.etag if encoding is None else f"{self.etag}-{encoding}"
+
+
+class ResponseCompressor:
+    """
+    Compress responses with brotli (if installed) or gzip as accepted by the client.
+    Static responses (index, layout, dependencies, assets and component suites) are serialized and compressed
+    once per process and revalidated with ETags, so repeated page loads get 304 without a body.
+    Pages are cached by path, assets by path and query (which carries their version) and only the most recently
+    used of them are kept.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.pages = {}
+        self.assets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def encodings(self):
+        """
+        Return supported content encodings, preferred first.
+        """
+
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def negotiate(self):
+        """
+        Return the best encoding accepted by the client, or None for an uncompressed response.
+        """
+
+        return request.accept_encodings.best_match(self.encodings())
+
+    def compress(self, body, encoding):
+        """
+        Return body compressed by the encoding.
+        """
+
+        if encoding == "br":
+            return brotli.compress(body, quality=self.settings["brotli_quality"])
+
+        return gzip.compress(body, compresslevel=self.settings["gzip_level"], mtime=0)
+
+    @staticmethod
+    def is_compressible(mimetype):
+        return mimetype is not None and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def is_cacheable():
+        """
+        Return whether the response to the current request is static. Nothing is cached in debug mode, which reloads assets.
+        """
+
+        if request.method != "GET" or current_app.debug:
+            return False
+
+        return request.path in CACHEABLE_PATHS or request.path.startswith(CACHEABLE_PREFIXES)
+
+    def lookup(self):
+        """
+        Return cached body of the current request, or None if it is not cached.
+        """
+
+        if request.path in CACHEABLE_PATHS:
+            return self.pages.get(request.path)
+
+        with self.lock:
+            entry = self.assets.get(request.full_path)
+            if entry is not None:
+                self.assets.move_to_end(request.full_path)
+            return entry
+
+    def store(self, entry):
+        """
+        Cache body of the current request, evict the least recently used assets over the limit.
+        """
+
+        if request.path in CACHEABLE_PATHS:
+            self.pages[request.path] = entry
+            return
+
+        with self.lock:
+            self.assets[request.full_path] = entry
+            self.assets.move_to_end(request.full_path)
+            while len(self.assets) > MAX_CACHED_ASSETS:
+                self.assets.popitem(last=False)
+
+    def respond(self, entry):
+        """
+        Return response of the cached body in the best encoding: 304 if the client holds this representation
+        of the current version, otherwise the body.
+        """
+
+        headers = {"Vary": "Accept-Encoding", "Cache-Control": entry.cache_control}
+
+        encoding = None
+        if self.is_compressible(entry.mimetype) and len(entry.body) >= self.settings["min_size"]:
+            encoding = self.negotiate()
+        etag = entry.variant_etag(encoding)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        if encoding not in entry.variants:
+            entry.variants[encoding] = self.compress(entry.body, encoding)
+
+        response = Response(entry.variants[encoding], content_type=entry.content_type, headers=headers)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        return response
+
+    def before_request(self):
+        """
+        Answer requests for static responses which are already cached without calling the view.
+        The request is marked, so that after_request does not cache the answer again.
+        """
+
+        if not self.is_cacheable():
+            return None
+
+        entry = self.lookup()
+        if entry is None:
+            return None
+
+        g.from_compression_cache = True
+        return self.respond(entry)
+
+    def after_request(self, response):
+        """
+        Cache static responses and compress the dynamic ones, e.g. figures returned by callbacks.
+        Streamed and file responses which are not static, like grid exports and tiles, are left untouched.
+        """
+
+        if g.get("from_compression_cache") or response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+
+        if self.is_cacheable():
+            response.direct_passthrough = False
+            entry = CachedBody(response.get_data(), response.mimetype, response.content_type, response.headers.get("Cache-Control"))
+            self.store(entry)
+            return self.respond(entry)
+
+        if response.is_streamed or response.direct_passthrough or not self.is_compressible(response.mimetype):
+            return response
+
+        body = response.get_data()
+        encoding = self.negotiate()
+        if encoding is None or len(body) < self.settings["min_size"]:
+            return response
+
+        response.set_data(self.compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
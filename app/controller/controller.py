@@ -2,8 +2,17 @@
 Module for controlling the runtime of the application.
 """
 
+import io
+import itertools
 import dash
+import numpy as np
 from dash import callback_context, Input, Output
+from flask import abort, jsonify, request, Response, send_file, stream_with_context
+from controller.export import stream_npy, stream_npz
+from controller.compression import ResponseCompressor
+from model.tiles import parse_time_key
+
+MESH_SIZE_RANGE = (0.01, 10.0)
 
 class Controller:
     """
@@ -24,11 +33,17 @@ class Controller:
             [Input("dropdown-quantity", "value"),
              Input("slider-time", "value"),
              Input("radio-items-model", "value"),
-             Input("dropdown-station", "value")]
+             Input("dropdown-station", "value"),
+             Input("checklist-playback", "value"),
+             Input("dropdown-run", "value"),
+             Input("dropdown-aggregation", "value"),
+             Input("slider-window", "value")]
         )
-        def update_contour(quantity, time, ex_model, station):
+        def update_contour(quantity, time, ex_model, station, playback, run, aggregation, window):
             """
             If new quantity is selected or new time is selected or new model is selected, adjust the model and update the contour figure.
+            If aggregation is selected, display the values reduced over the selected window of forecast times.
+            If playback is enabled, send all forecast times at once as frames of an animated figure.
             """
 
             ctx = callback_context
@@ -49,16 +64,70 @@ class Controller:
             elif triggered_input == "dropdown-station":
                 self.model.station = station
 
+            elif triggered_input == "dropdown-run":
+                self.model.select_run(run)
+
+            elif triggered_input == "dropdown-aggregation":
+                self.model.aggregation = None if aggregation == "none" else aggregation
+
+            elif triggered_input == "slider-window":
+                self.model.window = tuple(window)
+
+            self.model.clamp_selection()
+
+            if playback and "animate" in playback:
+                return self.model.update_animation_figure()
+
             return self.model.update_contour_figure()
 
         @self.app.callback(
-            [Output(f"graph-{quantity.lower().replace(' ', '-')}", "figure") for quantity in self.model.parser.quantities],
+            [Output("dropdown-station", "options"),
+             Output("dropdown-station", "value"),
+             Output("slider-time", "max"),
+             Output("slider-time", "marks"),
+             Output("slider-time", "value"),
+             Output("slider-window", "max"),
+             Output("slider-window", "marks"),
+             Output("slider-window", "value")],
+            Input("dropdown-run", "value"),
+            prevent_initial_call=True
+        )
+        def update_run_controls(run):
+            """
+            If new forecast run is selected, offer its stations and limit the time sliders to its forecast times.
+            """
+
+            self.model.select_run(run)
+            options = [{'label': f"Station {idx}", 'value': idx} for idx in self.model.stations_pos.index.tolist()]
+            last, marks = self.model.forecast_times() - 1, self.model.time_labels()
+
+            return options, self.model.station, last, marks, self.model.time, last, marks, list(self.model.window)
+
+        self.app.clientside_callback(
+            """
+            function(_) {
+                const graph = document.querySelector(".station-graph");
+                return graph ? graph.offsetWidth : window.innerWidth;
+            }
+            """,
+            Output("store-graph-width", "data"),
+            Input("bottom-content-container", "id")
+        )
+
+        graph_ids = [f"graph-{quantity.lower().replace(' ', '-')}" for quantity in self.model.parser.quantities]
+
+        @self.app.callback(
+            [Output(graph_id, "figure") for graph_id in graph_ids],
             [Input("dropdown-station", "value"),
-             Input("slider-time", "value")]
+             Input("slider-time", "value"),
+             Input("store-graph-width", "data"),
+             Input("dropdown-run", "value")] +
+            [Input(graph_id, "relayoutData") for graph_id in graph_ids]
         )
-        def update_graphs(station, time):
+        def update_graphs(station, time, width, run, *relayout_data):
             """
             If new station is selected, update all graphs.
+            Series are downsampled to the width of graphs. If a graph is zoomed, send detailed data of the zoomed range.
             """
 
             ctx = callback_context
@@ -67,14 +136,159 @@ class Controller:
 
             triggered_input = ctx.triggered[0]["prop_id"].split(".")[0]
 
+            if triggered_input in graph_ids:
+                i = graph_ids.index(triggered_input)
+                relayout = relayout_data[i] or {}
+                figures = [dash.no_update for _ in self.model.parser.quantities]
+
+                if "xaxis.range[0]" in relayout:
+                    x_range = [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]]
+                    figures[i] = self.model.update_graph_figure(i, width, x_range)
+                elif "xaxis.autorange" in relayout:
+                    figures[i] = self.model.update_graph_figure(i, width)
+
+                return tuple(figures)
+
             if triggered_input == "dropdown-station":
                 self.model.station = station
 
             elif triggered_input == "slider-time":
                 self.model.time = time
 
+            elif triggered_input == "dropdown-run":
+                self.model.select_run(run)
+
+            self.model.clamp_selection()
+
             figures = []
             for i, _ in enumerate(self.model.parser.quantities):
-                figures.append(self.model.update_graph_figure(i))
+                figures.append(self.model.update_graph_figure(i, width))
 
             return tuple(figures)
+
+    def register_routes(self):
+        """
+        Registers HTTP endpoints on the Flask server of the application.
+        """
+
+        server = self.app.server
+
+        @server.route("/api/points", methods=["POST"])
+        def query_points():
+            """
+            Return predictions of all quantities in all forecast times for a batch of (lon, lat) points.
+            Values of slices without data are null (NaN in npy).
+            Expects JSON {"points": [[lon, lat], ...], "model": 0, "format": "json" | "npy"}.
+            """
+
+            payload = request.get_json(silent=True) or {}
+
+            try:
+                points = np.asarray(payload.get("points"), dtype=float)
+            except (TypeError, ValueError):
+                return jsonify({"error": "Points must be a list of (lon, lat) pairs."}), 400
+
+            if points.ndim != 2 or points.shape[1] != 2 or len(points) == 0 or not np.isfinite(points).all():
+                return jsonify({"error": "Points must be a list of finite (lon, lat) pairs."}), 400
+
+            ex_model = payload.get("model", self.model.ex_model)
+            if not isinstance(ex_model, int) or isinstance(ex_model, bool) or ex_model not in (0, 1, 2):
+                return jsonify({"error": f"Invalid model: {ex_model}"}), 400
+
+            values = self.model.predict_points(points, ex_model)
+
+            if payload.get("format", "json") == "npy":
+                buffer = io.BytesIO()
+                np.save(buffer, values)
+                return Response(buffer.getvalue(), mimetype="application/octet-stream")
+
+            step = self.model.parser.forecast_settings["forecast_step"]
+            return jsonify({
+                "times": [time * step for time in range(values.shape[0])],
+                "quantities": self.model.parser.quantities,
+                "points": points.tolist(),
+                "values": np.where(np.isnan(values), None, values).tolist()
+            })
+
+        @server.route("/api/grids", methods=["GET"])
+        def export_grids():
+            """
+            Stream extrapolated grids of all quantities in all forecast times in the format (time, quantity, y, x).
+            Query parameters: model, mesh_size, format ("npy" or "npz"). Grids are computed and sent one time step at a time.
+            """
+
+            ex_model = request.args.get("model", self.model.ex_model, type=int)
+            if ex_model not in (0, 1, 2):
+                return jsonify({"error": f"Invalid model: {ex_model}"}), 400
+
+            mesh_size = request.args.get("mesh_size", 0.05, type=float)
+            if mesh_size is None or not np.isfinite(mesh_size) or not MESH_SIZE_RANGE[0] <= mesh_size <= MESH_SIZE_RANGE[1]:
+                return jsonify({"error": f"Mesh size must be between {MESH_SIZE_RANGE[0]} and {MESH_SIZE_RANGE[1]}."}), 400
+
+            file_format = request.args.get("format", "npy")
+            if file_format not in ("npy", "npz"):
+                return jsonify({"error": f"Invalid format: {file_format}"}), 400
+
+            xrange, yrange = self.model.build_range(mesh_size=mesh_size)
+            grids = self.model.iter_grids(xrange, yrange, ex_model)
+
+            if file_format == "npy":
+                shape = (self.model.forecast_times(), self.model.data.shape[2], len(yrange), len(xrange))
+                body = stream_npy(shape, np.float64, grids)
+                mimetype = "application/octet-stream"
+            else:
+                members = itertools.chain(
+                    [("x", xrange), ("y", yrange)],
+                    ((f"time_{time:03d}", grid) for time, grid in enumerate(grids))
+                )
+                body = stream_npz(members)
+                mimetype = "application/zip"
+
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={"Content-Disposition": f"attachment; filename=grids.{file_format}"}
+            )
+
+        @server.route("/tiles/<run>/<fingerprint>/<int:ex_model>/<int:quantity>/<time>/<int:zoom>/<int:x>/<int:y>.<ext>")
+        def serve_tile(run, fingerprint, ex_model, quantity, time, zoom, x, y, ext):
+            """
+            Serve cached raster tile of the contour overlay of the current run, render its pyramid first if it is missing.
+            Tiles of other data or settings than the current ones are not found.
+            """
+
+            renderer = self.model.tile_renderer
+            if run != self.model.run or ext != renderer.settings["format"]:
+                abort(404)
+
+            time = parse_time_key(time)
+            if time is None or not renderer.is_valid(ex_model, quantity, time, zoom, x, y):
+                abort(404)
+
+            if fingerprint != renderer.fingerprint(ex_model):
+                abort(404)
+
+            return send_file(renderer.get_tile(ex_model, quantity, time, zoom, x, y), max_age=3600)
+
+        @server.route("/api/stats", methods=["GET"])
+        def stats():
+            """
+            Return the memory held by the data cube, the cached grids and the fitted regressors in bytes,
+            and the numbers of executed and shared (coalesced) regressor fits and grid calculations.
+            """
+
+            return jsonify({"memory": self.model.memory_usage(), "coalescing": self.model.flights.stats()})
+
+    def register_compression(self):
+        """
+        Compress responses of the Flask server and cache the static ones (layout, assets) with ETags,
+        if it is enabled in configuration file.
+        """
+
+        settings = self.model.parser.compression_settings
+        if not settings["enabled"]:
+            return
+
+        self.compressor = ResponseCompressor(settings)
+        self.app.server.before_request(self.compressor.before_request)
+        self.app.server.after_request(self.compressor.after_request)
@@ -0,0 +1,66 @@
+"""
+Module for streaming serialization of arrays into NPY and NPZ formats.
+"""
+
+import io
+import zipfile
+import numpy as np
+
+
+class StreamBuffer(io.RawIOBase):
+    """
+    Write-only buffer collecting bytes which are handed out in chunks.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self):
+        """
+        Return all bytes written since the last call and empty the buffer.
+        """
+
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_npy(shape, dtype, chunks):
+    """
+    Yield NPY file of the given shape chunk by chunk. Chunks must cover the array in C order.
+    """
+
+    dtype = np.dtype(dtype)
+    buffer = StreamBuffer()
+    np.lib.format.write_array_header_2_0(buffer, {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": tuple(shape)
+    })
+    yield buffer.pop()
+
+    for chunk in chunks:
+        yield np.ascontiguousarray(chunk, dtype=dtype).tobytes()
+
+
+def stream_npz(named_chunks):
+    """
+    Yield NPZ file with one member for every (name, array) pair, one member at a time.
+    """
+
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, array in named_chunks:
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, np.asanyarray(array), allow_pickle=False)
+            yield buffer.pop()
+
+    yield buffer.pop()
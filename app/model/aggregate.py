@@ -0,0 +1,76 @@
+"""
+Module for reductions of the data cube over windows of forecast times.
+"""
+
+import numpy as np
+
+AGGREGATIONS = ["mean", "max", "min", "sum"]
+
+
+class TemporalAggregator:
+    """
+    Precompute cumulative sums and sparse tables of the (time, station, quantity) cube over the time axis,
+    so that mean, accumulation, maximum and minimum over any window take O(1) per station.
+    Missing values are skipped, a station without any valid value in the window gets NaN.
+    Sparse tables are stored in the precision of the data, at least float32, so they do not outgrow a reduced precision cube.
+    Cumulative sums stay in float64, a window sum is a difference of two running totals which would lose the precision
+    of the values on long series.
+    """
+
+    def __init__(self, data):
+        """
+        Build the cumulative sums and counts of valid values and the sparse tables of maxima and minima.
+        Level k of a sparse table holds reductions of windows of length 2^k starting at every time.
+        """
+
+        data = np.asarray(data)
+        data = data.astype(np.result_type(data.dtype, np.float32), copy=False)
+        valid = ~np.isnan(data)
+
+        self.n_times = data.shape[0]
+        self.dtype = data.dtype
+        self.prefix = np.zeros((self.n_times + 1,) + data.shape[1:])
+        np.cumsum(np.where(valid, data, 0.0), axis=0, dtype=np.float64, out=self.prefix[1:])
+        self.counts = None
+        if not valid.all():
+            self.counts = np.zeros((self.n_times + 1,) + data.shape[1:], dtype=np.int32)
+            np.cumsum(valid, axis=0, out=self.counts[1:])
+
+        self.max_table = [data]
+        self.min_table = [data]
+        length = 1
+        while 2 * length <= self.n_times:
+            self.max_table.append(np.fmax(self.max_table[-1][:-length], self.max_table[-1][length:]))
+            self.min_table.append(np.fmin(self.min_table[-1][:-length], self.min_table[-1][length:]))
+            length *= 2
+
+    @property
+    def nbytes(self):
+        size = self.prefix.nbytes + sum(level.nbytes for level in self.max_table[1:] + self.min_table[1:])
+        return size if self.counts is None else size + self.counts.nbytes
+
+    def reduce(self, method, start, end):
+        """
+        Return reduction of forecast times start..end (both included) in the format (station, quantity).
+        """
+
+        if not 0 <= start <= end < self.n_times:
+            raise ValueError(f"Invalid window: {start}-{end}")
+
+        if method in ("sum", "mean"):
+            total = self.prefix[end + 1] - self.prefix[start]
+            count = end - start + 1 if self.counts is None else self.counts[end + 1] - self.counts[start]
+            if self.counts is not None:
+                total = np.where(count > 0, total, np.nan)
+            if method == "sum":
+                return total.astype(self.dtype, copy=False)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return (total / count).astype(self.dtype, copy=False)
+
+        level = (end - start + 1).bit_length() - 1
+        if method == "max":
+            return np.fmax(self.max_table[level][start], self.max_table[level][end - 2 ** level + 1])
+        if method == "min":
+            return np.fmin(self.min_table[level][start], self.min_table[level][end - 2 ** level + 1])
+
+        raise ValueError(f"Invalid aggregation: {method}")
@@ -0,0 +1,91 @@
+"""
+Module for visual-preserving downsampling of time series.
+"""
+
+import numpy as np
+
+DOWNSAMPLING_METHODS = ["lttb", "minmax", "none"]
+
+
+def _nanarg(reducer, values):
+    """
+    Return position of the extreme of values ignoring NaN, or the first position when all values are NaN.
+    """
+
+    if np.isnan(values).all():
+        return 0
+    return int(reducer(values))
+
+
+def lttb(x, y, threshold):
+    """
+    Return indices of points selected by the Largest-Triangle-Three-Buckets algorithm.
+    First and last points are always kept, every inner bucket contributes the point forming the largest triangle
+    with the previously selected point and the average of the next bucket.
+    NaN values are ignored, a bucket without data keeps its first point so that the gap stays visible.
+    """
+
+    n_points = len(x)
+    if threshold >= n_points or threshold < 3:
+        return np.arange(n_points)
+
+    edges = np.linspace(1, n_points - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n_points - 1
+
+    finite = np.flatnonzero(np.isfinite(y))
+    anchor = finite[0] if len(finite) else 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n_points
+        next_y = y[end:next_end]
+        next_finite = np.isfinite(next_y)
+        if next_finite.any():
+            avg_x = x[end:next_end][next_finite].mean()
+            avg_y = next_y[next_finite].mean()
+        else:
+            avg_x = x[end:next_end].mean()
+            avg_y = y[anchor]
+
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (avg_y - y[anchor])
+        )
+        selected = start + _nanarg(np.nanargmax, area)
+        indices[i + 1] = selected
+        if np.isfinite(y[selected]):
+            anchor = selected
+
+    return indices
+
+
+def minmax(x, y, threshold):
+    """
+    Return indices of the minimum and maximum of every bucket, so that the envelope of the series is kept.
+    NaN values are ignored, a bucket without data keeps its first point.
+    """
+
+    n_points = len(x)
+    if threshold >= n_points or threshold < 4:
+        return np.arange(n_points)
+
+    edges = np.linspace(0, n_points, threshold // 2 + 1).astype(int)
+    indices = set()
+    for start, end in zip(edges[:-1], edges[1:]):
+        indices.add(start + _nanarg(np.nanargmin, y[start:end]))
+        indices.add(start + _nanarg(np.nanargmax, y[start:end]))
+
+    return np.array(sorted(indices))
+
+
+def downsample(x, y, threshold, method="lttb"):
+    """
+    Return indices of at most threshold points representing the series using the given method.
+    """
+
+    if method == "lttb":
+        return lttb(x, y, threshold)
+    if method == "minmax":
+        return minmax(x, y, threshold)
+    return np.arange(len(x))
@@ -0,0 +1,152 @@
+"""
+Module for ingesting raw station observations from CSV into the data cube of a forecast run.
+
+Usage: python3 -m model.ingest observations.csv --run name [--columns t2m ts rh pr] [--chunk-rows 500000]
+"""
+
+import os
+import argparse
+import time as timer
+import numpy as np
+import pandas as pd
+
+from model.parser import Parser
+from model.registry import DATA_SUFFIX, STATIONS_SUFFIX
+
+STATION_COLUMNS = ["lon", "lat"]
+
+
+def to_hours(values):
+    """
+    Return times as float hours, numeric columns are already hours, other columns are parsed as dates.
+    """
+
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+
+    return (pd.to_datetime(values) - pd.Timestamp(0)).to_numpy() / np.timedelta64(1, "h")
+
+
+def read_chunks(csv_path, columns, chunk_rows):
+    """
+    Return iterator over chunks of the selected columns of the CSV, so only one chunk is held in memory.
+    """
+
+    return pd.read_csv(csv_path, usecols=columns, chunksize=chunk_rows)
+
+
+def scan(csv_path, time_column, chunk_rows):
+    """
+    First pass: find all stations and the range of times. Return stations sorted by position and the first and last hour.
+    """
+
+    stations = None
+    first, last = np.inf, -np.inf
+
+    for chunk in read_chunks(csv_path, STATION_COLUMNS + [time_column], chunk_rows):
+        hours = to_hours(chunk[time_column])
+        first, last = min(first, hours.min()), max(last, hours.max())
+        chunk_stations = chunk[STATION_COLUMNS].drop_duplicates()
+        stations = chunk_stations if stations is None else pd.concat([stations, chunk_stations]).drop_duplicates()
+
+    if stations is None or len(stations) == 0:
+        raise ValueError(f"No observations in {csv_path}")
+
+    return stations.sort_values(STATION_COLUMNS).reset_index(drop=True), first, last
+
+
+def ingest(csv_path, directory, run, quantity_columns, time_column="time", step=6, dtype="float64",
+           chunk_rows=500_000, progress=None):
+    """
+    Stream the CSV of observations in the long format (time, lon, lat, quantity columns...) into the cube
+    (time, station, quantity) of the run stored as 'run_data.npy' and 'run_stations.csv' in the directory.
+    Times are placed on the grid with the given step in hours, missing observations are NaN.
+    The cube is written to a memory map chunk by chunk and the files appear only when it is complete.
+    progress(rows, seconds) is called after every chunk. Return statistics of the ingestion.
+    """
+
+    start = timer.perf_counter()
+    stations, first, last = scan(csv_path, time_column, chunk_rows)
+    station_index = pd.MultiIndex.from_frame(stations)
+    shape = (int(round((last - first) / step)) + 1, len(stations), len(quantity_columns))
+
+    stations_path = os.path.join(directory, run + STATIONS_SUFFIX)
+    data_path = os.path.join(directory, run + DATA_SUFFIX)
+    cube = np.lib.format.open_memmap(data_path + ".part", mode="w+", dtype=dtype, shape=shape)
+    cube[:] = np.nan
+
+    rows = 0
+    try:
+        for chunk in read_chunks(csv_path, STATION_COLUMNS + [time_column] + list(quantity_columns), chunk_rows):
+            steps = (to_hours(chunk[time_column]) - first) / step
+            times = np.rint(steps).astype(np.intp)
+            if not np.allclose(steps, times):
+                raise ValueError(f"Times in {csv_path} are not on the grid of {step} hours")
+
+            station_ids = station_index.get_indexer(pd.MultiIndex.from_frame(chunk[STATION_COLUMNS]))
+            cube[times, station_ids] = chunk[list(quantity_columns)].to_numpy(dtype=dtype)
+
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, timer.perf_counter() - start)
+
+        cube.flush()
+    except Exception:
+        del cube
+        os.remove(data_path + ".part")
+        raise
+
+    del cube
+    stations.to_csv(stations_path + ".part", index=False)
+    os.replace(data_path + ".part", data_path)
+    os.replace(stations_path + ".part", stations_path)
+
+    seconds = timer.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else float("inf"),
+        "shape": shape,
+        "bytes": os.path.getsize(data_path)
+    }
+
+
+def main():
+    """
+    Ingest the CSV into the data directory defined in configuration file and print the throughput.
+    """
+
+    parser = Parser("config.yaml")
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("csv_path")
+    argument_parser.add_argument("--run", required=True)
+    argument_parser.add_argument("--columns", nargs="+", default=parser.quantities)
+    argument_parser.add_argument("--time-column", default="time")
+    argument_parser.add_argument("--step", type=float, default=parser.forecast_settings["forecast_step"])
+    argument_parser.add_argument("--chunk-rows", type=int, default=500_000)
+    args = argument_parser.parse_args()
+
+    if len(args.columns) != len(parser.quantities):
+        argument_parser.error(f"Expected {len(parser.quantities)} columns, one for each quantity in configuration file.")
+
+    precision = parser.storage_settings["precision"]
+    stats = ingest(
+        args.csv_path,
+        os.path.join(root_dir, parser.dataset_settings["directory"]),
+        args.run,
+        args.columns,
+        time_column=args.time_column,
+        step=args.step,
+        dtype=precision if precision != "int16" else "float32",
+        chunk_rows=args.chunk_rows,
+        progress=lambda rows, seconds: print(f"{rows} rows, {rows / seconds:.0f} rows/s", flush=True)
+    )
+
+    print(f"Ingested {stats['rows']} rows in {stats['seconds']:.1f} s ({stats['rows_per_second']:.0f} rows/s), "
+          f"cube {stats['shape']} of {stats['bytes'] / 2 ** 20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
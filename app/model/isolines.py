@@ -0,0 +1,74 @@
+"""
+Module for extracting simplified isoband polygons from extrapolated planes.
+"""
+
+import numpy as np
+import contourpy
+
+
+def simplify(points, tolerance):
+    """
+    Simplify the polyline of (x, y) points by the Ramer-Douglas-Peucker algorithm,
+    dropping points which are closer than tolerance to the simplified line. End points are always kept.
+    """
+
+    if tolerance <= 0 or len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        inner = points[start + 1:end] - points[start]
+        direction = points[end] - points[start]
+        norm = np.hypot(*direction)
+        if norm == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(direction[0] * inner[:, 1] - direction[1] * inner[:, 0]) / norm
+
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            keep[start + 1 + i] = True
+            stack.append((start, start + 1 + i))
+            stack.append((start + 1 + i, end))
+
+    return points[keep]
+
+
+def isobands(Z, xrange, yrange, levels, tolerance):
+    """
+    Return polygons of the bands of Z between consecutive levels as a list of (x, y) arrays, one for every band.
+    Rings of all polygons of a band are separated by NaN, holes run in the opposite direction than outer rings,
+    so a single filled trace draws the whole band. The lowest and the highest band are open ended,
+    bands between equal levels are empty and NaN values are left out of all bands.
+    Rings are simplified to the tolerance and coordinates are rounded to a tenth of it.
+    """
+
+    generator = contourpy.contour_generator(xrange, yrange, np.ma.masked_invalid(Z), fill_type="OuterOffset")
+    bounds = np.array(levels, dtype=np.float64)
+    bounds[0], bounds[-1] = -np.inf, np.inf
+    decimals = max(int(np.ceil(-np.log10(tolerance))) + 1, 0) if tolerance > 0 else None
+
+    bands = []
+    for lower, upper in zip(bounds[:-1], bounds[1:]):
+        rings = []
+        polygons = zip(*generator.filled(lower, upper)) if lower < upper else []
+        for points, offsets in polygons:
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                ring = simplify(points[start:end], tolerance)
+                if len(ring) >= 4:
+                    rings.append(ring)
+                    rings.append(np.full((1, 2), np.nan))
+
+        coordinates = np.concatenate(rings[:-1]) if rings else np.empty((0, 2))
+        if decimals is not None:
+            coordinates = np.round(coordinates, decimals)
+        bands.append((coordinates[:, 0], coordinates[:, 1]))
+
+    return bands
@@ -3,14 +3,40 @@ Module for storage and maintenance of data of the application.
 """
 
 import os
+import pickle
+import threading
+from collections import OrderedDict
 import numpy as np
-import pandas as pd
+import matplotlib
+from matplotlib.colors import to_hex
 import plotly.graph_objects as go
 from sklearn.neighbors import KNeighborsRegressor
 from sklearn.svm import SVR
 from sklearn.ensemble import GradientBoostingRegressor
+from threadpoolctl import threadpool_limits
 
 from model.parser import Parser
+from model.storage import store
+from model.downsample import downsample
+from model.tiles import TileRenderer
+from model.registry import DatasetRegistry
+from model.aggregate import TemporalAggregator
+from model.validity import StationValidity, EmptyRegressor
+from model.isolines import isobands
+from model.singleflight import SingleFlight
+
+
+class RunSnapshot:
+    """
+    Consistent view of one forecast run: its name, data cube, station positions and caches.
+    Calculations use the snapshot taken when they start, so a concurrent switch of the run does not mix data of two runs.
+    """
+
+    def __init__(self, run, data, stations_pos, cache):
+        self.run = run
+        self.data = data
+        self.stations_pos = stations_pos
+        self.cache = cache
 
 
 class Model:
@@ -30,6 +56,23 @@ class Model:
         self.station = self.parser.default_view["station"]
         self.time = self.parser.default_view["time"]
         self.ex_model = self.parser.default_view["model"]
+        self.aggregation = None
+        self.window = (0, self.parser.forecast_settings["forecast_range"] - 1)
+
+        self.run = None
+        self.caches = {}
+        self.regressors = {}
+        self.grids = {}
+        self.neighbors = {}
+        self.weights = {}
+        self.isolines = {}
+        self.recent = OrderedDict()
+        self.regressor_bytes = {}
+        self.cache_lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.thread_limits_pid = None
+        self.tile_renderer = TileRenderer(self)
+        self.registry = self.create_registry()
 
         self.load_data()
 
@@ -49,37 +92,547 @@ class Model:
 
         return xrange, yrange
 
-    def calc_grid(self, xrange, yrange):
+    def create_regressor(self, ex_model):
         """
-        Based on steps of accuracy of x and y axes calculate the prediction for the whole plane.
+        Create unfitted regressor of the selected extrapolation model with parameters from configuration file.
+        kNN gets n_jobs from thread settings unless it is set in its own parameters.
         """
 
-        xx, yy = np.meshgrid(xrange, yrange)
-        grid_input = np.c_[xx.ravel(), yy.ravel()]
+        if ex_model == 0:
+            params = dict(self.parser.knn_model_params)
+            if self.parser.thread_settings["knn_n_jobs"] is not None:
+                params.setdefault("n_jobs", self.parser.thread_settings["knn_n_jobs"])
+            return KNeighborsRegressor(**params)
+        if ex_model == 1:
+            return SVR(**self.parser.svr_model_params)
+        return GradientBoostingRegressor(**self.parser.gbr_model_params)
+
+    def apply_thread_limits(self):
+        """
+        Limit BLAS and OpenMP thread pools of this process as defined in thread settings of configuration file.
+        The limits are process wide, so they are applied once in every (possibly forked) worker process before it fits or predicts.
+        """
+
+        if self.thread_limits_pid == os.getpid():
+            return
+
+        settings = self.parser.thread_settings
+        limits = {api: settings[f"{api}_threads"] for api in ("blas", "openmp") if settings[f"{api}_threads"] is not None}
+        if limits:
+            threadpool_limits(limits=limits)
+
+        self.thread_limits_pid = os.getpid()
+
+    def selected_time(self):
+        """
+        Return the selected forecast time, or (aggregation, start, end) if values are aggregated over a window.
+        """
+
+        if self.aggregation is None:
+            return self.time
+
+        return (self.aggregation,) + tuple(self.window)
+
+    def snapshot(self):
+        """
+        Return snapshot of the current run.
+        """
+
+        with self.cache_lock:
+            return RunSnapshot(self.run, self.data, self.stations_pos, self.caches.setdefault(self.run, self.new_cache()))
+
+    def get_aggregator(self, state=None):
+        """
+        Return aggregator of the data of the run, it is built once per run.
+        """
+
+        state = self.snapshot() if state is None else state
+        if "aggregator" not in state.cache:
+            state.cache["aggregator"] = TemporalAggregator(state.data[:self.forecast_times(state)])
+
+        return state.cache["aggregator"]
 
-        regressor = None
-        if self.ex_model == 0:
-            regressor = KNeighborsRegressor(**self.parser.knn_model_params)
-        elif self.ex_model == 1:
-            regressor = SVR(**self.parser.svr_model_params)
+    def get_validity(self, state=None):
+        """
+        Return validity bitmap of the data of the run, it is built once per run.
+        """
+
+        state = self.snapshot() if state is None else state
+        if "validity" not in state.cache:
+            state.cache["validity"] = StationValidity(state.data)
+
+        return state.cache["validity"]
+
+    def mask_id(self, time, quantity, state=None):
+        """
+        Return id of the mask of stations with valid values in the slice, aggregated slices are looked up by their values.
+        """
+
+        state = self.snapshot() if state is None else state
+        if isinstance(time, tuple):
+            return self.get_validity(state).mask_id(~np.isnan(self.station_values(time, quantity, state)))
+
+        return int(self.get_validity(state).ids[time, quantity])
+
+    def station_values(self, time, quantity, state=None):
+        """
+        Return values of the quantity at all stations. Time is either index of forecast time,
+        or (aggregation, start, end) for reduction over the window of forecast times.
+        """
+
+        state = self.snapshot() if state is None else state
+        if isinstance(time, tuple):
+            method, start, end = time
+            return self.get_aggregator(state).reduce(method, start, end)[:, quantity]
+
+        return state.data[time, :, quantity]
+
+    def get_regressor(self, time, quantity, ex_model, state=None):
+        """
+        Return regressor fitted on the valid station values of given time and quantity.
+        Slice without any valid station has no data, its regressor predicts NaN.
+        Fitted regressors are cached, so every slice is fitted only once. Concurrent requests for the same slice share one fit.
+        """
+
+        self.apply_thread_limits()
+
+        state = self.snapshot() if state is None else state
+        key = (time, quantity, ex_model)
+        regressors = state.cache["regressors"]
+        regressor = regressors.get(key)
+        if regressor is not None:
+            self.touch("regressors", key, state)
+            return regressor
+
+        def fit():
+            regressor = regressors.get(key)
+            if regressor is not None:
+                return regressor
+
+            stations = self.get_validity(state).stations[self.mask_id(time, quantity, state)]
+            positions = state.stations_pos.values[stations]
+            if len(positions) == 0:
+                regressor = EmptyRegressor()
+            else:
+                regressor = self.create_regressor(ex_model)
+                if ex_model == 0:
+                    regressor.set_params(n_neighbors=min(regressor.n_neighbors, len(positions)))
+                regressor.fit(positions, self.station_values(time, quantity, state)[stations])
+            state.cache["regressor_bytes"][key] = len(pickle.dumps(regressor))
+            regressors[key] = regressor
+            self.touch("regressors", key, state)
+            return regressor
+
+        regressor = self.flights.do(("regressor", state.run) + key, fit)
+        self.enforce_budget(state)
+        return regressor
+
+    @staticmethod
+    def new_cache():
+        """
+        Return empty caches of a run. Order of use of the cached regressors, grids, kNN weights and isolines
+        is kept in 'recent', so the least recently used ones are dropped first under the memory budget.
+        """
+
+        return {
+            "regressors": {},
+            "grids": {},
+            "neighbors": {},
+            "weights": {},
+            "isolines": {},
+            "recent": OrderedDict(),
+            "regressor_bytes": {}
+        }
+
+    def use_cache(self, cache):
+        """
+        Point the caches of the current run to the given ones.
+        """
+
+        self.regressors = cache["regressors"]
+        self.grids = cache["grids"]
+        self.neighbors = cache["neighbors"]
+        self.weights = cache["weights"]
+        self.isolines = cache["isolines"]
+        self.recent = cache["recent"]
+        self.regressor_bytes = cache["regressor_bytes"]
+
+    def clear_cache(self):
+        """
+        Drop all fitted regressors, neighbour searches and calculated grids of the current run, e.g. after the data were replaced.
+        """
+
+        self.caches[self.run] = self.new_cache()
+        self.use_cache(self.caches[self.run])
+
+    def touch(self, kind, key, state):
+        """
+        Mark the cached entry of the run as the most recently used one.
+        """
+
+        with self.cache_lock:
+            recent = state.cache["recent"]
+            recent[(kind, key)] = None
+            recent.move_to_end((kind, key))
+
+    def entry_bytes(self, cache, kind, key):
+        """
+        Return bytes held by the cached entry of the run, regressors are measured by their pickled form when fitted.
+        """
+
+        entry = cache[kind].get(key)
+        if entry is None:
+            return 0
+        if kind == "grids":
+            return entry.nbytes
+        if kind == "weights":
+            return entry[0].nbytes + entry[1].nbytes
+        if kind == "isolines":
+            return sum(x.nbytes + y.nbytes for _, x, y in entry[2])
+
+        return cache["regressor_bytes"].get(key, 0)
+
+    def enforce_budget(self, state=None):
+        """
+        Keep the memory held by the runs and their caches under the budget. The least recently used other runs
+        are evicted first, then the least recently used regressors, grids, kNN weights and isolines of the run.
+        Return number of dropped entries of the run.
+        """
+
+        if self.registry.memory_budget is None:
+            return 0
+
+        state = self.snapshot() if state is None else state
+        self.registry.enforce_budget(keep=state.run)
+        total = sum(self.registry.memory_usage().values())
+
+        dropped = 0
+        with self.cache_lock:
+            cache = state.cache
+            while total > self.registry.memory_budget and cache["recent"]:
+                (kind, key), _ = cache["recent"].popitem(last=False)
+                total -= self.entry_bytes(cache, kind, key)
+                cache[kind].pop(key, None)
+                if kind == "regressors":
+                    cache["regressor_bytes"].pop(key, None)
+                dropped += 1
+
+        return dropped
+
+    def drop_cache(self, run):
+        """
+        Drop all fitted regressors and calculated grids of the run, called when the registry evicts it.
+        """
+
+        self.caches.pop(run, None)
+
+    def cache_bytes(self, run):
+        """
+        Return bytes held by the regressors, grids, kNN weights, isolines, aggregations and validity bitmap calculated from the run.
+        """
+
+        cache = self.caches.get(run, {})
+        size = 0
+        for kind in ("regressors", "grids", "weights", "isolines"):
+            size += sum(self.entry_bytes(cache, kind, key) for key in list(cache.get(kind, {})))
+        for name in ("aggregator", "validity"):
+            if name in cache:
+                size += cache[name].nbytes
+
+        return int(size)
+
+    def forecast_times(self, state=None):
+        """
+        Return number of time steps available for the forecast.
+        """
+
+        data = self.data if state is None else state.data
+        return min(self.parser.forecast_settings["forecast_range"], data.shape[0])
+
+    def time_labels(self):
+        """
+        Return labels of the forecast times of the current run in hours.
+        """
+
+        step = self.parser.forecast_settings["forecast_step"]
+        return {i: f"{i * step}h" for i in range(self.forecast_times())}
+
+    def clamp_selection(self):
+        """
+        Limit the selected station, forecast time and aggregation window to the current run,
+        which may have fewer stations or forecast times than the previous one.
+        """
+
+        last = self.forecast_times() - 1
+        self.station = min(max(self.station, 0), len(self.stations_pos) - 1)
+        self.time = min(max(self.time, 0), last)
+        start, end = sorted(min(max(value, 0), last) for value in self.window)
+        self.window = (start, end)
+
+    def knn_weights(self, points, mask_id=0, state=None):
+        """
+        Find the nearest valid stations of all points and return their indices with normalized weights.
+        The neighbour search depends only on positions of the valid stations, so one kNN regressor serves all slices with the same mask.
+        If no station is valid, the weights are NaN, so the weighted sums give NaN.
+        """
+
+        state = self.snapshot() if state is None else state
+        validity = self.get_validity(state)
+        if validity.is_empty(mask_id):
+            return np.zeros((len(points), 1), dtype=np.intp), np.full((len(points), 1), np.nan)
+
+        dist, neigh_ind = self.get_neighbors(mask_id, state).kneighbors(points)
+
+        weights = self.parser.knn_model_params.get("weights", "uniform")
+        if weights == "distance":
+            with np.errstate(divide="ignore"):
+                neigh_weights = 1.0 / dist
+            inf_mask = np.isinf(neigh_weights)
+            inf_row = np.any(inf_mask, axis=1)
+            neigh_weights[inf_row] = inf_mask[inf_row]
+        elif callable(weights):
+            neigh_weights = weights(dist)
         else:
-            regressor = GradientBoostingRegressor(**self.parser.gbr_model_params)
+            neigh_weights = np.ones_like(dist)
 
-        regressor.fit(self.stations_pos.values, self.data[self.time, :, self.quantity])
+        stations = np.arange(len(state.stations_pos))[validity.stations[mask_id]]
+        return stations[neigh_ind], neigh_weights / neigh_weights.sum(axis=1, keepdims=True)
 
-        return regressor.predict(grid_input).reshape(xx.shape)
+    def get_neighbors(self, mask_id, state=None):
+        """
+        Return kNN regressor fitted on positions of the stations valid in the mask, used only for the neighbour search.
+        The mask must not be empty. It is fitted once per mask and shared by all slices with the same available stations.
+        """
 
-    def update_contour_figure(self):
+        self.apply_thread_limits()
+
+        state = self.snapshot() if state is None else state
+        neighbors = state.cache["neighbors"]
+        regressor = neighbors.get(mask_id)
+        if regressor is not None:
+            return regressor
+
+        def fit():
+            regressor = neighbors.get(mask_id)
+            if regressor is None:
+                positions = state.stations_pos.values[self.get_validity(state).stations[mask_id]]
+                regressor = self.create_regressor(0)
+                regressor.set_params(n_neighbors=min(regressor.n_neighbors, len(positions)))
+                neighbors[mask_id] = regressor.fit(positions, np.zeros(len(positions)))
+            return regressor
+
+        return self.flights.do(("neighbors", state.run, mask_id), fit)
+
+    def mesh_weights(self, xrange, yrange, mask_id, state=None):
         """
-        Create Contour figure based on the data from calc_grid. Use the color schemes defined in configuration file.
-        Mark all of the stations from stations_pos using markers and also highlight the currently selected station.
+        Return kNN indices and weights of all points of the mesh for the mask, cached so that planes of all slices
+        with the same available stations are calculated by a single weighted sum.
         """
 
-        fig = go.Figure()
-        xrange, yrange = self.build_range()
-        Z = self.calc_grid(xrange, yrange)
+        state = self.snapshot() if state is None else state
+        key = (mask_id,) + self.grid_key(xrange, yrange)
+        weights = state.cache["weights"]
+        mesh_weights = weights.get(key)
+        if mesh_weights is not None:
+            self.touch("weights", key, state)
+            return mesh_weights
+
+        def search():
+            mesh_weights = weights.get(key)
+            if mesh_weights is None:
+                xx, yy = np.meshgrid(xrange, yrange)
+                mesh_weights = self.knn_weights(np.c_[xx.ravel(), yy.ravel()], mask_id, state)
+                weights[key] = mesh_weights
+                self.touch("weights", key, state)
+            return mesh_weights
+
+        mesh_weights = self.flights.do(("weights", state.run) + key, search)
+        self.enforce_budget(state)
+        return mesh_weights
+
+    def predict_points(self, points, ex_model=None):
+        """
+        Predict all quantities in all forecast times for arbitrary points given as (lon, lat) pairs.
+        Return array in the format (time, point, quantity). kNN searches the neighbours once per station mask.
+        """
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        ex_model = self.ex_model if ex_model is None else ex_model
+        state = self.snapshot()
+        data = state.data
+        n_times = self.forecast_times(state)
+
+        if ex_model == 0:
+            validity = self.get_validity(state)
+            if validity.all_valid:
+                neigh_ind, neigh_weights = self.knn_weights(points, 0, state)
+                return np.einsum('tpkq,pk->tpq', data[:n_times][:, neigh_ind, :], neigh_weights)
+
+            values = np.empty((n_times, len(points), data.shape[2]))
+            mask_ids = validity.ids[:n_times]
+            for mask_id in np.unique(mask_ids):
+                times, quantities = np.nonzero(mask_ids == mask_id)
+                neigh_ind, neigh_weights = self.knn_weights(points, mask_id, state)
+                slices = data[times, :, quantities]
+                values[times, :, quantities] = np.einsum('spk,pk->sp', slices[:, neigh_ind], neigh_weights)
+            return values
+
+        values = np.empty((n_times, len(points), data.shape[2]))
+        for time in range(n_times):
+            for quantity in range(data.shape[2]):
+                values[time, :, quantity] = self.get_regressor(time, quantity, ex_model, state).predict(points)
+
+        return values
+
+    def calc_grid(self, xrange, yrange, time=None, quantity=None, ex_model=None, state=None):
+        """
+        Based on steps of accuracy of x and y axes calculate the prediction for the whole plane.
+        Time, quantity and model default to the currently selected ones, time may also be an aggregation window.
+        Planes are cached and concurrent requests for the same plane share one calculation.
+        kNN planes are weighted sums with the neighbours of the mesh shared by all slices with the same station mask.
+        """
+
+        time = self.selected_time() if time is None else time
+        quantity = self.quantity if quantity is None else quantity
+        ex_model = self.ex_model if ex_model is None else ex_model
+        state = self.snapshot() if state is None else state
+
+        key = (time, quantity, ex_model) + self.grid_key(xrange, yrange)
+        grids = state.cache["grids"]
+        Z = grids.get(key)
+        if Z is not None:
+            self.touch("grids", key, state)
+            return np.asarray(Z)
+
+        def predict():
+            Z = grids.get(key)
+            if Z is None:
+                xx, yy = np.meshgrid(xrange, yrange)
+                if ex_model == 0:
+                    mask_id = self.mask_id(time, quantity, state)
+                    neigh_ind, neigh_weights = self.mesh_weights(xrange, yrange, mask_id, state)
+                    values = np.einsum('pk,pk->p', self.station_values(time, quantity, state)[neigh_ind], neigh_weights)
+                else:
+                    values = self.get_regressor(time, quantity, ex_model, state).predict(np.c_[xx.ravel(), yy.ravel()])
+                Z = self.store_grid(values.reshape(xx.shape))
+                grids[key] = Z
+                self.touch("grids", key, state)
+            return Z
+
+        Z = self.flights.do(("grid", state.run) + key, predict)
+        self.enforce_budget(state)
+        return np.asarray(Z)
+
+    def calc_grids(self, xrange, yrange, quantity=None, ex_model=None):
+        """
+        Calculate the prediction for the whole plane in all forecast times of one quantity in a single batch.
+        Return array in the format (time, y, x). Calculated planes are shared with calc_grid through the cache.
+        """
+
+        quantity = self.quantity if quantity is None else quantity
+        ex_model = self.ex_model if ex_model is None else ex_model
+        state = self.snapshot()
+        grids = state.cache["grids"]
+        mesh_key = self.grid_key(xrange, yrange)
+        n_times = self.forecast_times(state)
+        times = [time for time in range(n_times) if (time, quantity, ex_model) + mesh_key not in grids]
+
+        if times and ex_model == 0:
+            shape = (len(yrange), len(xrange))
+            mask_ids = self.get_validity(state).ids[times, quantity]
+            for mask_id in np.unique(mask_ids):
+                group = [time for time, time_mask in zip(times, mask_ids) if time_mask == mask_id]
+                neigh_ind, neigh_weights = self.mesh_weights(xrange, yrange, mask_id, state)
+                values = np.einsum('tpk,pk->tp', state.data[group, :, quantity][:, neigh_ind], neigh_weights)
+                for time, Z in zip(group, values):
+                    grids[(time, quantity, ex_model) + mesh_key] = self.store_grid(Z.reshape(shape))
+                    self.touch("grids", (time, quantity, ex_model) + mesh_key, state)
+
+        return np.stack([self.calc_grid(xrange, yrange, time, quantity, ex_model, state) for time in range(n_times)])
+
+    def store_grid(self, Z):
+        """
+        Return the plane stored in the precision defined in configuration file.
+        """
+
+        return store(Z, self.parser.storage_settings["precision"], per_last_axis=False)
+
+    def memory_usage(self):
+        """
+        Return number of bytes held by the data cube, the cached grids, the fitted regressors and all caches of the current run.
+        Sizes are taken from the same accounting as the memory budget, a regressor is measured by its pickled form when fitted.
+        """
+
+        state = self.snapshot()
+        return {
+            "cube": int(state.data.nbytes),
+            "grids": int(sum(grid.nbytes for grid in list(state.cache["grids"].values()))),
+            "regressors": int(sum(list(state.cache["regressor_bytes"].values()))),
+            "caches": self.cache_bytes(state.run),
+            "runs": self.registry.memory_usage()
+        }
+
+    @staticmethod
+    def grid_key(xrange, yrange):
+        """
+        Return hashable description of the mesh used as a part of the grid cache key.
+        """
+
+        return (xrange[0], xrange[-1], len(xrange), yrange[0], yrange[-1], len(yrange))
+
+    def iter_grids(self, xrange, yrange, ex_model=None):
+        """
+        Yield predictions of all quantities for the whole plane one forecast time after another.
+        Every yielded array has the format (quantity, y, x), so only one time step is held in memory.
+        """
+
+        ex_model = self.ex_model if ex_model is None else ex_model
+        state = self.snapshot()
+        xx, yy = np.meshgrid(xrange, yrange)
+        grid_input = np.c_[xx.ravel(), yy.ravel()]
+        n_quantities = state.data.shape[2]
+
+        if ex_model == 0:
+            validity = self.get_validity(state)
+            neighbors = {}
+
+        for time in range(self.forecast_times(state)):
+            if ex_model == 0:
+                row = np.asarray(state.data[time])
+                values = np.empty((n_quantities, len(grid_input)))
+                for mask_id in np.unique(validity.ids[time]):
+                    if mask_id not in neighbors:
+                        neighbors[mask_id] = self.knn_weights(grid_input, mask_id, state)
+                    neigh_ind, neigh_weights = neighbors[mask_id]
+                    quantities = np.flatnonzero(validity.ids[time] == mask_id)
+                    values[quantities] = np.einsum('pkq,pk->qp', row[:, quantities][neigh_ind], neigh_weights)
+            else:
+                values = np.stack([
+                    self.get_regressor(time, quantity, ex_model, state).predict(grid_input)
+                    for quantity in range(n_quantities)
+                ])
+
+            yield values.reshape((n_quantities,) + xx.shape)
+
+    @staticmethod
+    def value_range(Z):
+        """
+        Return minimum and maximum of the plane ignoring NaN, a plane without data gives (0, 0).
+        """
+
+        finite = Z[np.isfinite(Z)]
+        if finite.size == 0:
+            return 0.0, 0.0
 
-        fig.add_trace(go.Contour(
+        return float(finite.min()), float(finite.max())
+
+    def contour_trace(self, Z, xrange, yrange, z_min, z_max):
+        """
+        Create Contour trace of the plane Z with levels spread between z_min and z_max.
+        Use the color scheme of the current quantity defined in configuration file.
+        """
+
+        return go.Contour(
             z=Z,
             x=xrange,
             y=yrange,
@@ -89,13 +642,24 @@ class Model:
             contours={
                 "showlabels": True,
                 "labelfont": {"size": 7, "color": 'white'},
-                "start": Z.min(),
-                "end": Z.max(),
-                "size": (Z.max() - Z.min()) / 7
+                "start": z_min,
+                "end": z_max,
+                "size": (z_max - z_min) / self.parser.contour_settings["levels"]
             },
             line_width=0,
             opacity=1
-        ))
+        )
+
+    def contour_figure(self, traces):
+        """
+        Create figure from the given traces and mark all of the stations from stations_pos using markers.
+        Also highlight the currently selected station.
+        """
+
+        fig = go.Figure()
+
+        for trace in traces:
+            fig.add_trace(trace)
 
         fig.add_trace(go.Scatter(
             x=self.stations_pos['lon'],
@@ -144,16 +708,192 @@ class Model:
         )
         return fig
 
-    def update_graph_figure(self, quantity_idx):
+    def update_contour_figure(self):
+        """
+        Create Contour figure based on the data from calc_grid. Use the color schemes defined in configuration file.
+        Mark all of the stations from stations_pos using markers and also highlight the currently selected station.
+        """
+
+        if self.parser.contour_settings["mode"] == "raster":
+            return self.update_raster_figure()
+        if self.parser.contour_settings["mode"] == "isolines":
+            return self.update_isoline_figure()
+
+        xrange, yrange = self.build_range()
+        Z = self.calc_grid(xrange, yrange)
+
+        return self.contour_figure([self.contour_trace(Z, xrange, yrange, *self.value_range(Z))])
+
+    def colorbar_trace(self, z_min, z_max):
+        """
+        Create empty Scatter trace showing only the color bar of the current quantity between z_min and z_max.
+        """
+
+        return go.Scatter(
+            x=[None],
+            y=[None],
+            mode='markers',
+            marker={
+                "colorscale": self.parser.contour_color_schemes[self.quantity],
+                "cmin": z_min,
+                "cmax": z_max,
+                "showscale": True,
+                "colorbar": {"title": f'{self.parser.quantities[self.quantity]}'}
+            },
+            showlegend=False
+        )
+
+    def calc_isolines(self, xrange, yrange):
+        """
+        Return (z_min, z_max, bands) of the current plane, where every band is (color, x, y) of its simplified polygons.
+        Levels are spread between the minimum and maximum of the plane as in the Contour trace.
+        Isolines are extracted once per cached plane and concurrent requests share one extraction.
+        """
+
+        time, quantity, ex_model = self.selected_time(), self.quantity, self.ex_model
+        state = self.snapshot()
+        key = (time, quantity, ex_model) + self.grid_key(xrange, yrange)
+        isolines = state.cache["isolines"]
+        result = isolines.get(key)
+        if result is not None:
+            self.touch("isolines", key, state)
+            return result
+
+        def extract():
+            result = isolines.get(key)
+            if result is None:
+                Z = self.calc_grid(xrange, yrange, time, quantity, ex_model, state)
+                z_min, z_max = self.value_range(Z)
+                settings = self.parser.contour_settings
+                levels = np.linspace(z_min, z_max, settings["levels"] + 1)
+                colormap = matplotlib.colormaps[self.parser.contour_color_schemes[quantity]]
+                colors = [to_hex(color) for color in colormap(np.linspace(0, 1, settings["levels"]))]
+                bands = isobands(Z, xrange, yrange, levels, settings["simplify_tolerance"])
+                result = (z_min, z_max, [(color, x, y) for color, (x, y) in zip(colors, bands)])
+                isolines[key] = result
+                self.touch("isolines", key, state)
+            return result
+
+        result = self.flights.do(("isolines", state.run) + key, extract)
+        self.enforce_budget(state)
+        return result
+
+    def update_isoline_figure(self):
+        """
+        Create figure from precomputed isoband polygons instead of the dense plane, one filled trace per band,
+        so the size of the figure depends on the complexity of the contours rather than on the mesh size.
+        """
+
+        xrange, yrange = self.build_range()
+        z_min, z_max, bands = self.calc_isolines(xrange, yrange)
+
+        traces = [
+            go.Scatter(
+                x=x,
+                y=y,
+                mode='lines',
+                fill='toself',
+                fillcolor=color,
+                line={"width": 0},
+                hoverinfo='skip',
+                showlegend=False
+            )
+            for color, x, y in bands if len(x)
+        ]
+        fig = self.contour_figure(traces + [self.colorbar_trace(z_min, z_max)])
+
+        fig.update_layout(
+            xaxis={"range": [xrange[0], xrange[-1]], "showgrid": False, "zeroline": False},
+            yaxis={"range": [yrange[0], yrange[-1]], "showgrid": False, "zeroline": False}
+        )
+        return fig
+
+    def update_raster_figure(self):
+        """
+        Create figure displaying the plane as cached raster tiles served by the Flask server instead of Contour trace.
+        The color bar is kept by an empty Scatter trace using the same color scheme.
+        """
+
+        xrange, yrange = self.build_range()
+        Z = self.calc_grid(xrange, yrange)
+
+        fig = self.contour_figure([self.colorbar_trace(*self.value_range(Z))])
+
+        fig.update_layout(
+            images=self.tile_renderer.layout_images(self.selected_time(), self.quantity, self.ex_model),
+            xaxis={"range": [xrange[0], xrange[-1]], "showgrid": False, "zeroline": False},
+            yaxis={"range": [yrange[0], yrange[-1]], "showgrid": False, "zeroline": False}
+        )
+        return fig
+
+    def update_animation_figure(self):
+        """
+        Create Contour figure with one frame for every forecast time of the current quantity and model.
+        All planes are calculated in one batch and the playback runs in the browser.
+        Levels are shared by all frames, so the colors are comparable in time.
+        """
+
+        xrange, yrange = self.build_range()
+        grids = self.calc_grids(xrange, yrange)
+        z_min, z_max = self.value_range(grids)
+        step = self.parser.forecast_settings["forecast_step"]
+
+        fig = self.contour_figure([self.contour_trace(grids[self.time], xrange, yrange, z_min, z_max)])
+        fig.frames = [
+            go.Frame(data=[go.Contour(z=Z)], traces=[0], name=str(time))
+            for time, Z in enumerate(grids)
+        ]
+
+        frame_args = {"frame": {"duration": 500, "redraw": True}, "transition": {"duration": 0}, "mode": "immediate"}
+        fig.update_layout(
+            updatemenus=[{
+                "type": "buttons",
+                "direction": "left",
+                "x": 0.05,
+                "y": 0.05,
+                "buttons": [
+                    {"label": "Play", "method": "animate", "args": [None, dict(frame_args, fromcurrent=True)]},
+                    {"label": "Pause", "method": "animate", "args": [[None], frame_args]}
+                ]
+            }],
+            sliders=[{
+                "active": self.time,
+                "x": 0.2,
+                "y": 0.05,
+                "len": 0.75,
+                "currentvalue": {"visible": False},
+                "steps": [
+                    {"label": f"{time * step}h", "method": "animate", "args": [[str(time)], frame_args]}
+                    for time in range(len(grids))
+                ]
+            }]
+        )
+        return fig
+
+    def update_graph_figure(self, quantity_idx, width=None, x_range=None):
         """
         Based on quantity index return graph of quantity of a currently selected station.
+        If width of the graph in pixels is known, the series is downsampled to the number of points it can display.
+        If x_range is given, only the zoomed part of the series is sent, in full detail up to the same limit.
         """
 
         fig = go.Figure()
-        data = self.data[:self.parser.forecast_settings["forecast_range"], self.station, quantity_idx]
+        data = np.asarray(self.data[:self.parser.forecast_settings["forecast_range"], self.station, quantity_idx])
+        hours = np.arange(len(data)) * self.parser.forecast_settings["forecast_step"]
+
+        if x_range is not None:
+            start = max(np.searchsorted(hours, x_range[0], side="right") - 1, 0)
+            end = np.searchsorted(hours, x_range[1], side="left") + 1
+            hours, data = hours[start:end], data[start:end]
+            fig.update_xaxes(range=x_range)
+
+        if width:
+            settings = self.parser.graph_settings
+            indices = downsample(hours, data, int(width * settings["points_per_pixel"]), settings["downsampling"])
+            hours, data = hours[indices], data[indices]
 
         fig.add_trace(go.Scatter(
-            x=np.arange(len(data)) * self.parser.forecast_settings["forecast_step"],
+            x=hours,
             y=data,
             mode="lines",
             name=f'{self.quantity}',
@@ -180,18 +920,45 @@ class Model:
 
         return fig
 
-    def load_data(self):
+    def create_registry(self):
+        """
+        Create registry of the forecast runs stored in the data directory defined in configuration file.
+        """
+
+        settings = self.parser.dataset_settings
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        memory_budget = settings["memory_budget_mb"] * 2 ** 20 if settings["memory_budget_mb"] else None
+
+        return DatasetRegistry(
+            os.path.join(root_dir, settings["directory"]),
+            precision=self.parser.storage_settings["precision"],
+            memory_budget=memory_budget,
+            on_evict=self.drop_cache,
+            cache_bytes=self.cache_bytes
+        )
+
+    def load_data(self, run=None):
         """
-        Load both station positions and sample data from file '/data'. Sample stations are stored as csv, sample data as npy.
+        Load both station positions and data of the run from the data directory, the default run is defined in configuration file.
+        Stations are stored as csv, data as npy which is memory mapped. Caches of the run are restored if they were not evicted.
         If files aren't accessible, return error.
         """
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        stations_file_path = os.path.join(base_dir, 'data', 'sample_stations.csv')
-        data_file_path = os.path.join(base_dir, 'data', 'sample_data.npy')
+        run = self.parser.dataset_settings["run"] if run is None else run
 
-        if os.path.exists(stations_file_path) and os.path.exists(data_file_path):
-            self.stations_pos = pd.read_csv(stations_file_path)
-            self.data = np.load(data_file_path)
-        else:
-            raise FileNotFoundError(f"Could not find data files at {stations_file_path} or {data_file_path}")
+        stations_pos, data = self.registry.open(run)
+        with self.cache_lock:
+            self.stations_pos, self.data = stations_pos, data
+            self.run = run
+            self.use_cache(self.caches.setdefault(run, self.new_cache()))
+        self.clamp_selection()
+
+        self.enforce_budget()
+
+    def select_run(self, run):
+        """
+        Switch to another forecast run if it differs from the current one.
+        """
+
+        if run != self.run:
+            self.load_data(run)
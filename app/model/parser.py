@@ -6,6 +6,8 @@ import os
 import yaml
 import matplotlib.pyplot as plt
 from matplotlib.colors import is_color_like
+from model.storage import PRECISIONS
+from model.downsample import DOWNSAMPLING_METHODS
 
 REQUIRED_DICT_KEYS = {
     "default_view": ["quantity", "station", "time", "model"],
@@ -26,6 +28,49 @@ REQUIRED_KEYS = {
     "gbr_model_params": dict
 }
 
+OPTIONAL_KEYS = {
+    "contour_settings": {
+        "mode": "contour",
+        "levels": 7,
+        "simplify_tolerance": 0.01
+    },
+    "tile_settings": {
+        "directory": "tiles",
+        "format": "png",
+        "tile_size": 256,
+        "max_zoom": 2,
+        "display_zoom": 1
+    },
+    "storage_settings": {
+        "precision": "float64"
+    },
+    "graph_settings": {
+        "downsampling": "lttb",
+        "points_per_pixel": 1,
+        "default_width": 800
+    },
+    "thread_settings": {
+        "blas_threads": None,
+        "openmp_threads": None,
+        "knn_n_jobs": None
+    },
+    "dataset_settings": {
+        "directory": "model/data",
+        "run": "sample",
+        "memory_budget_mb": 1024
+    },
+    "compression_settings": {
+        "enabled": True,
+        "min_size": 1024,
+        "gzip_level": 6,
+        "brotli_quality": 5
+    }
+}
+
+CONTOUR_MODES = ["contour", "raster", "isolines"]
+
+TILE_FORMATS = ["png", "webp"]
+
 class Parser:
     """
     Parse and validate data from yaml configration file.
@@ -44,6 +89,13 @@ class Parser:
         self.svr_model_params = {}
         self.gbr_model_params = {}
         self.default_view = {}
+        self.contour_settings = {}
+        self.tile_settings = {}
+        self.storage_settings = {}
+        self.graph_settings = {}
+        self.thread_settings = {}
+        self.dataset_settings = {}
+        self.compression_settings = {}
 
         self.parse_config(config_file)
 
@@ -65,6 +117,12 @@ class Parser:
         self.validate_config_colors_nr()
         self.validate_config_colors()
         self.validate_config_color_schemes()
+        self.validate_config_contour_settings()
+        self.validate_config_storage_settings()
+        self.validate_config_graph_settings()
+        self.validate_config_thread_settings()
+        self.validate_config_compression_settings()
+        self.validate_config_dataset_settings()
 
     def validate_list(self, config_data, list_name):
         """
@@ -90,6 +148,17 @@ class Parser:
             raise ValueError(f"Invalid or missing '{dict_name}' in configuration.")
 
 
+    def validate_optional_dict(self, config_data, dict_name, defaults):
+        """
+        Validate if an optional variable is a dictionary and fill in the default values of missing keys.
+        """
+
+        value = config_data.get(dict_name, {})
+        if not isinstance(value, dict):
+            raise ValueError(f"Invalid '{dict_name}' in configuration.")
+
+        setattr(self, dict_name, {**defaults, **value})
+
     def validate_config(self, config_data):
         """
         Validate all the required informaiton. 
@@ -101,6 +170,9 @@ class Parser:
             else:
                 self.validate_dict(config_data, key)
 
+        for key, defaults in OPTIONAL_KEYS.items():
+            self.validate_optional_dict(config_data, key, defaults)
+
     def validate_config_colors(self):
         """
         Validate if the defined color in configuration is valid and can be interpreted by matplotlib.
@@ -131,4 +203,90 @@ class Parser:
 
         if min_thrs > len(self.contour_color_schemes):
             raise ValueError("Not enough colorschemes defined")
-        
\ No newline at end of file
+        
+    def validate_config_contour_settings(self):
+        """
+        Validate if the contour rendering mode and the tile format are supported, and the contour levels and simplification.
+        """
+
+        if self.contour_settings["mode"] not in CONTOUR_MODES:
+            raise ValueError(f"Invalid contour mode: {self.contour_settings['mode']}")
+
+        levels = self.contour_settings["levels"]
+        if not isinstance(levels, int) or levels < 1:
+            raise ValueError(f"Invalid number of contour levels: {levels}")
+
+        tolerance = self.contour_settings["simplify_tolerance"]
+        if not isinstance(tolerance, (int, float)) or tolerance < 0:
+            raise ValueError(f"Invalid simplify tolerance: {tolerance}")
+
+        if self.tile_settings["format"] not in TILE_FORMATS:
+            raise ValueError(f"Invalid tile format: {self.tile_settings['format']}")
+
+        if not 0 <= self.tile_settings["display_zoom"] <= self.tile_settings["max_zoom"]:
+            raise ValueError("Display zoom must be between 0 and max zoom.")
+
+    def validate_config_storage_settings(self):
+        """
+        Validate if the storage precision of the data and grids is supported.
+        """
+
+        if self.storage_settings["precision"] not in PRECISIONS:
+            raise ValueError(f"Invalid precision: {self.storage_settings['precision']}")
+
+    def validate_config_graph_settings(self):
+        """
+        Validate if the downsampling method of time series graphs is supported
+        and the default width of the graphs is a positive number of pixels.
+        """
+
+        if self.graph_settings["downsampling"] not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"Invalid downsampling method: {self.graph_settings['downsampling']}")
+
+        width = self.graph_settings["default_width"]
+        if not isinstance(width, int) or width < 1:
+            raise ValueError(f"Invalid default graph width: {width}")
+
+    def validate_config_thread_settings(self):
+        """
+        Validate if the thread limits are positive integers, null means no limit.
+        kNN n_jobs may also be -1 to use all cores.
+        """
+
+        for key, value in self.thread_settings.items():
+            if value is None or (key == "knn_n_jobs" and value == -1):
+                continue
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"Invalid thread limit '{key}': {value}")
+
+    def validate_config_compression_settings(self):
+        """
+        Validate if the compression switch is boolean, the minimal size is not negative and the compression levels are in range.
+        """
+
+        settings = self.compression_settings
+        if not isinstance(settings["enabled"], bool):
+            raise ValueError(f"Invalid compression switch: {settings['enabled']}")
+
+        if not isinstance(settings["min_size"], int) or settings["min_size"] < 0:
+            raise ValueError(f"Invalid minimal size of compressed responses: {settings['min_size']}")
+
+        if not isinstance(settings["gzip_level"], int) or not 1 <= settings["gzip_level"] <= 9:
+            raise ValueError(f"Invalid gzip level: {settings['gzip_level']}")
+
+        if not isinstance(settings["brotli_quality"], int) or not 0 <= settings["brotli_quality"] <= 11:
+            raise ValueError(f"Invalid brotli quality: {settings['brotli_quality']}")
+
+    def validate_config_dataset_settings(self):
+        """
+        Validate if the data directory and the default run are non-empty names and the memory budget is a positive number, null means no budget.
+        """
+
+        settings = self.dataset_settings
+        for key in ("directory", "run"):
+            if not isinstance(settings[key], str) or not settings[key].strip():
+                raise ValueError(f"Invalid dataset {key}: {settings[key]}")
+
+        budget = settings["memory_budget_mb"]
+        if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (int, float)) or not budget > 0):
+            raise ValueError(f"Invalid memory budget: {budget}")
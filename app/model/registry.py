@@ -0,0 +1,138 @@
+"""
+Module for discovering and lazily loading forecast runs stored in the data directory.
+"""
+
+import os
+import glob
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from model.storage import store
+
+DATA_SUFFIX = "_data.npy"
+STATIONS_SUFFIX = "_stations.csv"
+
+
+class DatasetRegistry:
+    """
+    Registry of forecast runs. Run 'name' consists of files 'name_data.npy' and 'name_stations.csv'.
+    Cubes are opened lazily as memory maps and the least recently used runs are evicted under the memory budget.
+    """
+
+    def __init__(self, directory, precision="float64", memory_budget=None, on_evict=None, cache_bytes=None):
+        """
+        Assign the data directory, storage precision and memory budget in bytes.
+        on_evict(name) is called when a run is evicted, cache_bytes(name) returns bytes of caches derived from the run.
+        """
+
+        self.directory = directory
+        self.precision = precision
+        self.memory_budget = memory_budget
+        self.on_evict = on_evict
+        self.cache_bytes = cache_bytes
+        self.runs = OrderedDict()
+
+    def paths(self, name):
+        """
+        Return paths of the stations and data files of the run.
+        """
+
+        return os.path.join(self.directory, name + STATIONS_SUFFIX), os.path.join(self.directory, name + DATA_SUFFIX)
+
+    def discover(self):
+        """
+        Return sorted names of all runs which have both stations and data file.
+        """
+
+        names = []
+        for data_path in glob.glob(os.path.join(self.directory, "*" + DATA_SUFFIX)):
+            name = os.path.basename(data_path)[:-len(DATA_SUFFIX)]
+            if os.path.exists(self.paths(name)[0]):
+                names.append(name)
+
+        return sorted(names)
+
+    def open(self, name):
+        """
+        Return station positions and data cube of the run. The cube is memory mapped if it is stored in the requested precision.
+        If files aren't accessible, return error.
+        """
+
+        if name in self.runs:
+            self.runs.move_to_end(name)
+            return self.runs[name]
+
+        stations_file_path, data_file_path = self.paths(name)
+        if not (os.path.exists(stations_file_path) and os.path.exists(data_file_path)):
+            raise FileNotFoundError(f"Could not find data files at {stations_file_path} or {data_file_path}")
+
+        stations_pos = pd.read_csv(stations_file_path)
+        data = store(np.load(data_file_path, mmap_mode="r"), self.precision)
+
+        self.runs[name] = (stations_pos, data)
+        return self.runs[name]
+
+    def fingerprint(self, name):
+        """
+        Return text identifying the version of the run files by their sizes and modification times,
+        it changes whenever the run is rewritten, e.g. by a new ingestion under the same name.
+        """
+
+        parts = []
+        for path in self.paths(name):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+
+        return "_".join(parts)
+
+    def run_bytes(self, name):
+        """
+        Return bytes held by the run and the caches derived from it.
+        """
+
+        size = int(self.runs[name][1].nbytes)
+        if self.cache_bytes is not None:
+            size += self.cache_bytes(name)
+
+        return size
+
+    def memory_usage(self):
+        """
+        Return bytes held by every open run including its derived caches.
+        """
+
+        return {name: self.run_bytes(name) for name in self.runs}
+
+    def evict(self, name):
+        """
+        Close the run and drop caches derived from it.
+        """
+
+        self.runs.pop(name, None)
+        if self.on_evict is not None:
+            self.on_evict(name)
+
+    def enforce_budget(self, keep=None):
+        """
+        Evict the least recently used runs until the memory budget is met. Run 'keep' is never evicted.
+        Return names of evicted runs.
+        """
+
+        evicted = []
+        if self.memory_budget is None:
+            return evicted
+
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        for name in list(self.runs):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            total -= usage[name]
+            self.evict(name)
+            evicted.append(name)
+
+        return evicted
@@ -0,0 +1,71 @@
+"""
+Module for coalescing identical concurrent computations.
+"""
+
+import threading
+
+
+class Call:
+    """
+    Computation in flight, waiting callers block on its event.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run every computation identified by a key at most once at a time.
+    Callers asking for a key which is already being computed wait for the first caller and share its result.
+    Counters record per kind of computation (first item of the key) how many calls were executed and how many shared.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.counters = {}
+
+    def do(self, key, function):
+        """
+        Return result of function(), or the result of identical computation which is already in flight.
+        """
+
+        with self.lock:
+            counter = self.counters.setdefault(key[0], {"executed": 0, "shared": 0})
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = Call()
+                self.calls[key] = call
+                counter["executed"] += 1
+            else:
+                counter["shared"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+        return call.result
+
+    def stats(self):
+        """
+        Return copy of the counters.
+        """
+
+        with self.lock:
+            return {kind: dict(counter) for kind, counter in self.counters.items()}
@@ -0,0 +1,80 @@
+"""
+Module for storing arrays in reduced precision.
+"""
+
+import warnings
+import numpy as np
+
+PRECISIONS = ["float64", "float32", "int16"]
+
+INT16_NAN = np.iinfo(np.int16).min
+INT16_MAX = np.iinfo(np.int16).max
+
+
+class QuantizedArray:
+    """
+    Array stored as int16 scaled linearly between minimum and maximum along the last axis (or of the whole array).
+    Indexing returns dequantized float32 values, missing values are stored as INT16_NAN.
+    """
+
+    def __init__(self, values, per_last_axis=True):
+        """
+        Quantize the values. With per_last_axis every quantity of the (time, station, quantity) cube has its own scale.
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        axes = tuple(range(values.ndim - 1)) if per_last_axis else None
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            v_min = np.nan_to_num(np.nanmin(values, axis=axes))
+            v_max = np.nan_to_num(np.nanmax(values, axis=axes))
+
+        self.offset = (v_max + v_min) / 2
+        self.scale = np.where(v_max > v_min, (v_max - v_min) / (2 * INT16_MAX), 1.0)
+
+        raw = np.rint((values - self.offset) / self.scale)
+        self.raw = np.where(np.isnan(raw), INT16_NAN, raw).astype(np.int16)
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def ndim(self):
+        return self.raw.ndim
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes + np.asarray(self.scale).nbytes + np.asarray(self.offset).nbytes
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, key):
+        raw = self.raw[key]
+        scale = np.broadcast_to(self.scale, self.raw.shape)[key]
+        offset = np.broadcast_to(self.offset, self.raw.shape)[key]
+
+        values = (raw * scale + offset).astype(np.float32)
+        return np.where(raw == INT16_NAN, np.float32(np.nan), values)
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[...]
+        return values if dtype is None else values.astype(dtype)
+
+
+def store(values, precision, per_last_axis=True):
+    """
+    Return values stored in the requested precision: float64, float32 or scaled int16.
+    """
+
+    if precision == "int16":
+        return QuantizedArray(values, per_last_axis)
+
+    return np.asarray(values, dtype=precision)
+
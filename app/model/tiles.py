@@ -0,0 +1,263 @@
+"""
+Module for rendering extrapolated planes into cached raster tile pyramids.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import matplotlib
+from PIL import Image
+
+from model.aggregate import AGGREGATIONS
+
+
+def time_key(time):
+    """
+    Return text form of the forecast time used in paths and URLs, aggregation windows are written as 'method-start-end'.
+    """
+
+    if isinstance(time, tuple):
+        return "-".join(str(part) for part in time)
+
+    return str(time)
+
+
+def parse_time_key(key):
+    """
+    Parse text form of the forecast time, return None if it is invalid.
+    """
+
+    parts = key.split("-")
+    if len(parts) == 1 and key.isdigit():
+        return int(key)
+
+    if len(parts) == 3 and parts[0] in AGGREGATIONS and parts[1].isdigit() and parts[2].isdigit():
+        return (parts[0], int(parts[1]), int(parts[2]))
+
+    return None
+
+
+class TileRenderer:
+    """
+    Render planes of the Model into pyramids of square image tiles stored on disk.
+    Zoom level z splits the plane into 2^z x 2^z tiles, tile (0, 0) is the top left one.
+    """
+
+    def __init__(self, model):
+        """
+        Assign the data model. Settings are read from its parser when they are needed.
+        """
+
+        self.model = model
+        self.thread = None
+
+    @property
+    def settings(self):
+        """
+        Return tile settings from configuration file.
+        """
+
+        return self.model.parser.tile_settings
+
+    def directory(self):
+        """
+        Return absolute path of the directory with cached tiles.
+        """
+
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(root_dir, self.settings["directory"])
+
+    def fingerprint(self, ex_model):
+        """
+        Return short hash of everything the tiles of the model depend on: version of the run files,
+        parameters of the model, storage precision, mesh, color schemes and tile settings.
+        Tiles are stored and served under it, so tiles rendered from other data or settings are never reused.
+        """
+
+        xrange, yrange = self.model.build_range()
+        params = [self.model.parser.knn_model_params, self.model.parser.svr_model_params, self.model.parser.gbr_model_params]
+        description = json.dumps({
+            "run": self.model.registry.fingerprint(self.model.run),
+            "params": params[ex_model],
+            "precision": self.model.parser.storage_settings["precision"],
+            "mesh": self.model.grid_key(xrange, yrange),
+            "colors": self.model.parser.contour_color_schemes,
+            "tiles": [self.settings["tile_size"], self.settings["max_zoom"]]
+        }, sort_keys=True, default=str)
+
+        return hashlib.sha256(description.encode()).hexdigest()[:12]
+
+    def tile_path(self, ex_model, quantity, time, zoom, x, y):
+        """
+        Return path of the tile file of the current run.
+        """
+
+        return os.path.join(
+            self.directory(), self.model.run, self.fingerprint(ex_model), str(ex_model), str(quantity), time_key(time),
+            str(zoom), str(x), f"{y}.{self.settings['format']}"
+        )
+
+    def tile_url(self, ex_model, quantity, time, zoom, x, y):
+        """
+        Return URL of the tile of the current run served by the Flask server.
+        The fingerprint is a part of the URL, so browsers do not keep showing tiles of old data.
+        """
+
+        return (
+            f"/tiles/{self.model.run}/{self.fingerprint(ex_model)}/{ex_model}/{quantity}/{time_key(time)}"
+            f"/{zoom}/{x}/{y}.{self.settings['format']}"
+        )
+
+    def is_valid(self, ex_model, quantity, time, zoom, x, y):
+        """
+        Validate if the tile indices exist in the pyramid.
+        """
+
+        if isinstance(time, tuple):
+            valid_time = 0 <= time[1] <= time[2] < self.model.forecast_times()
+        else:
+            valid_time = 0 <= time < self.model.forecast_times()
+
+        return (
+            valid_time
+            and ex_model in (0, 1, 2)
+            and 0 <= quantity < len(self.model.parser.quantities)
+            and 0 <= zoom <= self.settings["max_zoom"]
+            and 0 <= x < 2 ** zoom
+            and 0 <= y < 2 ** zoom
+        )
+
+    def colorize(self, Z, quantity):
+        """
+        Map the plane to RGBA image using the color scheme of the quantity. Rows are flipped, so north is up.
+        NaN values (slices without data) are transparent.
+        """
+
+        z_min, z_max = self.model.value_range(Z)
+        normalized = (Z - z_min) / (z_max - z_min) if z_max > z_min else np.where(np.isnan(Z), np.nan, 0.0)
+        colormap = matplotlib.colormaps[self.model.parser.contour_color_schemes[quantity]]
+
+        return Image.fromarray(colormap(normalized[::-1], bytes=True))
+
+    def render_pyramid(self, time, quantity, ex_model):
+        """
+        Render all zoom levels of the plane of given time, quantity and model into tiles. Return number of tiles written.
+        Concurrent requests for the same pyramid share one rendering and a complete pyramid is not rendered again.
+        """
+
+        def render():
+            if self.is_rendered(time, quantity, ex_model):
+                return 0
+            return self.write_pyramid(time, quantity, ex_model)
+
+        key = ("pyramid", self.model.run, self.fingerprint(ex_model), time, quantity, ex_model)
+        return self.model.flights.do(key, render)
+
+    def is_rendered(self, time, quantity, ex_model):
+        """
+        Return whether the pyramid is complete, its last tile is written last.
+        """
+
+        n_tiles = 2 ** self.settings["max_zoom"]
+        return os.path.exists(self.tile_path(ex_model, quantity, time, self.settings["max_zoom"], n_tiles - 1, n_tiles - 1))
+
+    def write_pyramid(self, time, quantity, ex_model):
+        """
+        Write tiles of all zoom levels of the plane. Every tile is written to a temporary file and renamed,
+        so a tile which exists is always complete.
+        """
+
+        xrange, yrange = self.model.build_range()
+        image = self.colorize(self.model.calc_grid(xrange, yrange, time, quantity, ex_model), quantity)
+        tile_size = self.settings["tile_size"]
+
+        count = 0
+        for zoom in range(self.settings["max_zoom"] + 1):
+            n_tiles = 2 ** zoom
+            level = image.resize((tile_size * n_tiles, tile_size * n_tiles), Image.BILINEAR)
+            for x in range(n_tiles):
+                for y in range(n_tiles):
+                    path = self.tile_path(ex_model, quantity, time, zoom, x, y)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    box = (x * tile_size, y * tile_size, (x + 1) * tile_size, (y + 1) * tile_size)
+                    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+                    level.crop(box).save(temporary_path, format=self.settings["format"].upper())
+                    os.replace(temporary_path, path)
+                    count += 1
+
+        return count
+
+    def render_all(self, ex_models=(0, 1, 2)):
+        """
+        Render pyramids of all forecast times and quantities for the given models, which are not rendered yet.
+        Return number of tiles written.
+        """
+
+        count = 0
+        for ex_model in ex_models:
+            for quantity in range(len(self.model.parser.quantities)):
+                for time in range(self.model.forecast_times()):
+                    count += self.render_pyramid(time, quantity, ex_model)
+
+        return count
+
+    def start_background(self, ex_models=(0, 1, 2)):
+        """
+        Render all pyramids in a background thread, so the server can start immediately.
+        """
+
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.render_all, args=(ex_models,), daemon=True)
+            self.thread.start()
+
+        return self.thread
+
+    def get_tile(self, ex_model, quantity, time, zoom, x, y):
+        """
+        Return path of the tile, render its pyramid first if it is not cached yet.
+        If the pyramid is being rendered by another request, wait for it instead of rendering it again.
+        """
+
+        path = self.tile_path(ex_model, quantity, time, zoom, x, y)
+        if not os.path.exists(path):
+            self.render_pyramid(time, quantity, ex_model)
+
+        return path
+
+    def layout_images(self, time, quantity, ex_model):
+        """
+        Return layout images covering the plane with tiles of the display zoom level.
+        """
+
+        xrange, yrange = self.model.build_range()
+        zoom = self.settings["display_zoom"]
+        n_tiles = 2 ** zoom
+        width = (xrange[-1] - xrange[0]) / n_tiles
+        height = (yrange[-1] - yrange[0]) / n_tiles
+
+        return [
+            {
+                "source": self.tile_url(ex_model, quantity, time, zoom, x, y),
+                "xref": "x",
+                "yref": "y",
+                "x": xrange[0] + x * width,
+                "y": yrange[-1] - y * height,
+                "sizex": width,
+                "sizey": height,
+                "xanchor": "left",
+                "yanchor": "top",
+                "sizing": "stretch",
+                "layer": "below"
+            }
+            for x in range(n_tiles)
+            for y in range(n_tiles)
+        ]
+
+
+if __name__ == "__main__":
+    from model.model import Model
+
+    written = TileRenderer(Model()).render_all()
+    print(f"Rendered {written} tiles.")
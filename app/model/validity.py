@@ -0,0 +1,78 @@
+"""
+Module for tracking which stations hold valid (not missing) values in the slices of the data cube.
+"""
+
+import threading
+import numpy as np
+
+
+class StationValidity:
+    """
+    Validity bitmap of the (time, station, quantity) cube grouped by station masks.
+    Every slice (time, quantity) gets the id of its mask, slices with the same available stations share one id,
+    so everything derived from the positions of the valid stations only is computed once per mask.
+    """
+
+    def __init__(self, data, chunk_size=64):
+        """
+        Scan the cube for missing values chunk by chunk over time, so a memory mapped cube is not loaded at once.
+        """
+
+        n_times, n_stations, n_quantities = data.shape
+        valid = np.empty((n_times, n_quantities, n_stations), dtype=bool)
+        for start in range(0, n_times, chunk_size):
+            chunk = np.asarray(data[start:start + chunk_size])
+            valid[start:start + chunk_size] = ~np.isnan(chunk).transpose(0, 2, 1)
+
+        masks, ids = np.unique(valid.reshape(-1, n_stations), axis=0, return_inverse=True)
+
+        self.lock = threading.Lock()
+        self.masks = list(masks)
+        self.ids = ids.reshape(n_times, n_quantities)
+        self.stations = [self.station_index(mask) for mask in self.masks]
+
+    @staticmethod
+    def station_index(mask):
+        """
+        Return index selecting the valid stations, a slice if all of them are valid so that indexing makes no copy.
+        """
+
+        return slice(None) if mask.all() else np.flatnonzero(mask)
+
+    def is_empty(self, mask_id):
+        """
+        Return whether no station is valid in the mask.
+        """
+
+        return not self.masks[mask_id].any()
+
+    @property
+    def all_valid(self):
+        return len(self.masks) == 1 and self.masks[0].all()
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + sum(mask.nbytes for mask in self.masks)
+
+    def mask_id(self, valid):
+        """
+        Return id of the given station mask, e.g. of values aggregated over a window, add it if it is new.
+        """
+
+        with self.lock:
+            for mask_id, mask in enumerate(self.masks):
+                if np.array_equal(mask, valid):
+                    return mask_id
+
+            self.masks.append(np.array(valid, dtype=bool))
+            self.stations.append(self.station_index(self.masks[-1]))
+            return len(self.masks) - 1
+
+
+class EmptyRegressor:
+    """
+    Stand-in for the regressor of a slice without any valid station, there is no data, so it predicts NaN everywhere.
+    """
+
+    def predict(self, points):
+        return np.full(len(points), np.nan)
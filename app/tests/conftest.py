@@ -0,0 +1,73 @@
+"""
+Shared fixtures and reporting of the test suite.
+"""
+
+import pytest
+from flexmock import flexmock
+from model.parser import Parser
+
+EQUIVALENCE_REPORT = []
+
+
+@pytest.fixture
+def mock_parser(tmp_path):
+    """
+    Fixture to create a mock Parser without calling the constructor using FlexMock, tiles are stored in a temporary directory.
+    Test modules override the fixture to change the settings they depend on.
+    """
+
+    parser = flexmock(Parser)
+
+    parser.quantities = ["Air Temperature", "Ground Temperature", "Air Humidity", "Wind Direction", "Wind"]
+    parser.graph_colors = ["blue", "red", "black", "gray", "maroon"]
+    parser.contour_color_schemes = ["viridis", "inferno", "magma", "cividis", "plasma"]
+    parser.forecast_settings = {
+        "forecast_range": 5,
+        "forecast_step": 6
+    }
+    parser.default_view = {
+        "quantity": "Air Temperature",
+        "station": 0,
+        "time": 0,
+        "model": 0
+    }
+    parser.knn_model_params = {"n_neighbors": 2, "algorithm": "auto", "weights": "uniform"}
+    parser.svr_model_params = {"C": 1.0, "kernel": "rbf", "gamma": "scale"}
+    parser.gbr_model_params = {"learning_rate": 0.1, "n_estimators": 100, "subsample": 1.0}
+    parser.contour_settings = {"mode": "contour", "levels": 7, "simplify_tolerance": 0.01}
+    parser.tile_settings = {"directory": str(tmp_path), "format": "png", "tile_size": 64, "max_zoom": 1, "display_zoom": 1}
+    parser.storage_settings = {"precision": "float64"}
+    parser.graph_settings = {"downsampling": "lttb", "points_per_pixel": 1, "default_width": 800}
+    parser.thread_settings = {"blas_threads": 1, "openmp_threads": 1, "knn_n_jobs": None}
+    parser.compression_settings = {"enabled": True, "min_size": 1024, "gzip_level": 6, "brotli_quality": 5}
+
+    return parser
+
+
+@pytest.fixture(scope="session")
+def equivalence_report():
+    """
+    Fixture collecting errors and speedups of the compared extrapolation paths.
+    """
+
+    return EQUIVALENCE_REPORT
+
+
+def pytest_terminal_summary(terminalreporter):
+    """
+    Print the equivalence report after the test run.
+    """
+
+    if not EQUIVALENCE_REPORT:
+        return
+
+    terminalreporter.section("numerical equivalence")
+    terminalreporter.write_line(
+        f"{'case':<11}{'path':<16}{'model':<7}{'precision':<10}{'reference':<10}"
+        f"{'max abs':>11}{'max rel':>11}{'rms rel':>11}{'speedup':>9}"
+    )
+    for row in EQUIVALENCE_REPORT:
+        terminalreporter.write_line(
+            f"{row['case']:<11}{row['path']:<16}{row['model']:<7}{row['precision']:<10}{row['reference']:<10}"
+            f"{row['max_abs']:>11.2e}{row['max_rel']:>11.2e}{row['rms_rel']:>11.2e}{row['speedup']:>9.2f}"
+        )
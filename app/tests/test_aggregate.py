@@ -0,0 +1,122 @@
+"""
+Module for testing the TemporalAggregator class.
+"""
+
+import warnings
+import pytest
+import numpy as np
+from model.aggregate import TemporalAggregator
+
+@pytest.fixture
+def cube():
+    """
+    Return random cube in the format (time, station, quantity).
+    """
+
+    return np.random.default_rng(0).random((37, 6, 3))
+
+@pytest.mark.parametrize("method, reduction", [
+    ("mean", np.mean),
+    ("max", np.max),
+    ("min", np.min),
+    ("sum", np.sum)
+])
+def test_reduce(cube, method, reduction):
+    """
+    Test reductions of all windows against direct reductions of the cube.
+    """
+
+    aggregator = TemporalAggregator(cube)
+
+    for start in range(37):
+        for end in range(start, 37):
+            assert np.allclose(aggregator.reduce(method, start, end), reduction(cube[start:end + 1], axis=0))
+
+@pytest.mark.parametrize("method, start, end", [
+    ("mean", 5, 4),
+    ("max", -1, 3),
+    ("sum", 0, 37),
+    ("median", 0, 3)
+])
+def test_reduce_invalid(cube, method, start, end):
+    """
+    Test invalid windows and aggregations.
+    """
+
+    with pytest.raises(ValueError):
+        TemporalAggregator(cube).reduce(method, start, end)
+
+def test_sparse_table_levels(cube):
+    """
+    Test the number and sizes of sparse table levels.
+    """
+
+    aggregator = TemporalAggregator(cube)
+
+    assert len(aggregator.max_table) == 6
+    assert [len(level) for level in aggregator.max_table] == [37, 36, 34, 30, 22, 6]
+    assert aggregator.nbytes > cube.nbytes
+
+@pytest.mark.parametrize("method, reduction", [
+    ("mean", np.mean),
+    ("max", np.max),
+    ("min", np.min),
+    ("sum", np.sum)
+])
+def test_reduce_float32(cube, method, reduction):
+    """
+    Test that tables of a float32 cube are stored in float32 and stay close to reductions in float64.
+    """
+
+    aggregator = TemporalAggregator(cube.astype(np.float32))
+
+    assert aggregator.prefix.dtype == np.float64
+    assert all(level.dtype == np.float32 for level in aggregator.max_table + aggregator.min_table)
+    assert aggregator.nbytes < TemporalAggregator(cube).nbytes
+    for start in range(37):
+        for end in range(start, 37):
+            result = aggregator.reduce(method, start, end)
+            assert result.dtype == np.float32
+            assert np.allclose(result, reduction(cube[start:end + 1], axis=0), rtol=1e-5, atol=1e-5)
+
+def test_reduce_float32_long_series():
+    """
+    Test that short windows at the end of a long float32 series keep the precision of the values.
+    """
+
+    cube = (288 + np.random.default_rng(1).normal(0, 5, (5000, 50, 2))).astype(np.float32)
+    aggregator = TemporalAggregator(cube)
+
+    for start in [4990, 4995, 4999]:
+        assert np.allclose(aggregator.reduce("mean", start, start), cube[start], rtol=0, atol=1e-4)
+        expected = cube[start - 10:start + 1].astype(np.float64).sum(axis=0)
+        assert np.allclose(aggregator.reduce("sum", start - 10, start), expected, rtol=0, atol=1e-3)
+
+@pytest.mark.parametrize("method, reduction", [
+    ("mean", np.nanmean),
+    ("max", np.nanmax),
+    ("min", np.nanmin),
+    ("sum", np.nansum)
+])
+def test_reduce_missing(cube, method, reduction):
+    """
+    Test that missing values are skipped and windows without any valid value give NaN.
+    """
+
+    cube[3:9, 2, 1] = np.nan
+    cube[0, 4, :] = np.nan
+    aggregator = TemporalAggregator(cube)
+
+    for start in range(12):
+        for end in range(start, 12):
+            window = cube[start:end + 1]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                expected = np.where(np.isnan(window).all(axis=0), np.nan, reduction(window, axis=0))
+            assert np.allclose(aggregator.reduce(method, start, end), expected, equal_nan=True)
+
+    assert aggregator.reduce(method, 0, 11).dtype == np.float64
+    assert TemporalAggregator(cube.astype(np.float32)).reduce(method, 0, 11).dtype == np.float32
+    assert np.isnan(aggregator.reduce(method, 4, 7)[2, 1])
+    assert np.isnan(aggregator.reduce(method, 0, 0)[4]).all()
+    assert not np.isnan(aggregator.reduce(method, 0, 1)).any()
@@ -0,0 +1,326 @@
+"""
+Module for testing the Controller class.
+"""
+
+import io
+import gzip
+import pytest
+import numpy as np
+import pandas as pd
+from dash import Dash, html, dcc
+from controller.controller import Controller
+from controller.compression import MAX_CACHED_ASSETS
+from model.model import Model
+
+@pytest.fixture
+def mock_parser(mock_parser):
+    """
+    Fixture to adjust the shared mock Parser to three quantities and distance weighted kNN.
+    """
+
+    mock_parser.quantities = ["Air Temperature", "Ground Temperature", "Air Humidity"]
+    mock_parser.knn_model_params = {"n_neighbors": 2, "algorithm": "auto", "weights": "distance"}
+
+    return mock_parser
+
+@pytest.fixture
+def mock_model(mock_parser):
+    """
+    Fixture to create a mock Model.
+    """
+
+    model = Model()
+    model.stations_pos = pd.DataFrame({
+        'lon': [10.0, 20.0, 30.0, 40.0],
+        'lat': [30.0, 40.0, 50.0, 60.0]
+    })
+    model.data = np.random.rand(5, 4, 3)
+    model.time = 0
+    model.quantity = 0
+    model.station = 0
+    model.ex_model = 0
+    model.parser = mock_parser
+    return model
+
+@pytest.fixture
+def client(mock_model):
+    """
+    Fixture to create a test client of the Flask server with registered routes.
+    """
+
+    app = Dash(__name__)
+    app.layout = html.Div()
+    controller = Controller(app, mock_model)
+    controller.register_routes()
+    return app.server.test_client()
+
+
+def test_query_points_json(client, mock_model):
+    """
+    Test the point query endpoint with JSON output.
+    """
+
+    response = client.post("/api/points", json={"points": [[10.0, 30.0], [25.0, 45.0]], "model": 0})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["times"] == [0, 6, 12, 18, 24]
+    assert payload["quantities"] == mock_model.parser.quantities
+    values = np.array(payload["values"])
+    assert values.shape == (5, 2, 3)
+    assert np.allclose(values[:, 0, :], mock_model.data[:, 0, :])
+
+def test_query_points_npy(client):
+    """
+    Test the point query endpoint with NPY output.
+    """
+
+    response = client.post("/api/points", json={"points": [[10.0, 30.0]], "model": 1, "format": "npy"})
+
+    assert response.status_code == 200
+    assert np.load(io.BytesIO(response.data)).shape == (5, 1, 3)
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"points": [[10.0, 30.0, 1.0]]},
+    {"points": "abc"},
+    {"points": [[10.0, 30.0]], "model": 5},
+    {"points": [[float("nan"), 49.0]]},
+    {"points": [[float("inf"), 49.0]], "model": 1},
+    {"points": [[10.0, 30.0]], "model": True},
+    {"points": [[10.0, 30.0]], "model": 1.0}
+])
+def test_query_points_invalid(client, payload):
+    """
+    Test the point query endpoint with invalid requests.
+    """
+
+    response = client.post("/api/points", json=payload)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1)
+])
+def test_export_grids_npy(client, mock_model, model):
+    """
+    Test the grid export endpoint with NPY output.
+    """
+
+    response = client.get(f"/api/grids?model={model}&mesh_size=1.0")
+
+    assert response.status_code == 200
+    grids = np.load(io.BytesIO(response.data))
+    xrange, yrange = mock_model.build_range(mesh_size=1.0)
+    assert grids.shape == (5, 3, len(yrange), len(xrange))
+    assert np.allclose(grids[2, 1], mock_model.calc_grid(xrange, yrange, 2, 1, model))
+
+def test_export_grids_npz(client, mock_model):
+    """
+    Test the grid export endpoint with NPZ output.
+    """
+
+    response = client.get("/api/grids?model=0&mesh_size=1.0&format=npz")
+
+    assert response.status_code == 200
+    archive = np.load(io.BytesIO(response.data))
+    xrange, yrange = mock_model.build_range(mesh_size=1.0)
+    assert np.allclose(archive["x"], xrange)
+    assert np.allclose(archive["y"], yrange)
+    assert len([name for name in archive.files if name.startswith("time_")]) == 5
+    assert np.allclose(archive["time_004"][2], mock_model.calc_grid(xrange, yrange, 4, 2, 0))
+
+@pytest.mark.parametrize("query", [
+    "model=7",
+    "mesh_size=0",
+    "mesh_size=nan",
+    "mesh_size=inf",
+    "mesh_size=50",
+    "format=csv"
+])
+def test_export_grids_invalid(client, query):
+    """
+    Test the grid export endpoint with invalid parameters.
+    """
+
+    response = client.get(f"/api/grids?{query}")
+
+    assert response.status_code == 400
+
+def test_serve_tile(client, mock_model, tmp_path):
+    """
+    Test the tile endpoint.
+    """
+
+    mock_model.parser.tile_settings["directory"] = str(tmp_path)
+
+    fingerprint = mock_model.tile_renderer.fingerprint(0)
+
+    response = client.get(f"/tiles/sample/{fingerprint}/0/1/2/1/1/0.png")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+
+    assert client.get(f"/tiles/sample/{fingerprint}/0/1/2/1/2/0.png").status_code == 404
+    assert client.get(f"/tiles/sample/{fingerprint}/0/1/2/1/1/0.webp").status_code == 404
+    assert client.get("/tiles/sample/000000000000/0/1/2/1/1/0.png").status_code == 404
+
+def test_stats(client, mock_model):
+    """
+    Test the stats endpoint reporting memory usage.
+    """
+
+    client.post("/api/points", json={"points": [[10.0, 30.0]], "model": 1})
+    payload = client.get("/api/stats").get_json()
+
+    assert payload["memory"]["cube"] == mock_model.data.nbytes
+    assert payload["memory"]["regressors"] > 0
+
+def test_stats_coalescing(client):
+    """
+    Test that the stats endpoint reports coalescing counters.
+    """
+
+    assert len(client.get("/api/grids?model=1&mesh_size=1.0").data) > 0
+    payload = client.get("/api/stats").get_json()
+
+    assert payload["coalescing"]["regressor"]["executed"] == 15
+    assert payload["coalescing"]["regressor"]["shared"] == 0
+
+def test_empty_slice(client, mock_model):
+    """
+    Test that point queries and grid exports succeed with a slice without data, which is NaN.
+    """
+
+    mock_model.data[2, :, 1] = np.nan
+
+    payload = client.post("/api/points", json={"points": [[12.0, 35.0]], "model": 1}).get_json()
+    assert payload["values"][2][0][1] is None
+    assert payload["values"][2][0][0] is not None
+
+    response = client.get("/api/grids?model=0&mesh_size=1.0&format=npy")
+    assert response.status_code == 200
+    grids = np.load(io.BytesIO(response.data))
+    assert grids.shape[:2] == (5, 3)
+    assert np.isnan(grids[2, 1]).all()
+    assert not np.isnan(grids[3]).any()
+
+@pytest.fixture
+def compressed_client(mock_model):
+    """
+    Fixture to create a test client of the Flask server with a figure in the layout and response compression.
+    """
+
+    app = Dash(__name__)
+    app.layout = html.Div([dcc.Graph(id="contour-graph", figure=mock_model.update_contour_figure())])
+    controller = Controller(app, mock_model)
+    controller.register_routes()
+    controller.register_compression()
+    return app.server.test_client()
+
+def test_layout_compression(compressed_client):
+    """
+    Test that the layout is compressed, cached and revalidated with ETag.
+    """
+
+    plain = compressed_client.get("/_dash-layout")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"]
+
+    response = compressed_client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data) == plain.data
+    assert len(response.data) < len(plain.data) / 2
+    assert response.headers["ETag"] != plain.headers["ETag"]
+
+    revalidated = compressed_client.get("/_dash-layout", headers={"If-None-Match": plain.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+    mismatched = compressed_client.get(
+        "/_dash-layout", headers={"If-None-Match": plain.headers["ETag"], "Accept-Encoding": "gzip"}
+    )
+    assert mismatched.status_code == 200
+    assert mismatched.headers["ETag"] == response.headers["ETag"]
+
+def test_compression_cache_keys(mock_model):
+    """
+    Test that pages are cached once regardless of the query and assets are cached up to the limit.
+    """
+
+    app = Dash(__name__)
+    app.layout = html.Div()
+    controller = Controller(app, mock_model)
+    controller.register_compression()
+    compressor = controller.compressor
+    compressed_client = app.server.test_client()
+
+    compressed_client.get("/_dash-layout")
+    compressed_client.get("/_dash-layout?a=1")
+    compressed_client.get("/_dash-layout?a=2")
+    assert list(compressor.pages) == ["/_dash-layout"]
+
+    html_page = compressed_client.get("/").get_data(as_text=True)
+    script = html_page.split('<script src="')[1].split('"')[0].split("?")[0]
+    for i in range(MAX_CACHED_ASSETS + 10):
+        assert compressed_client.get(f"{script}?m={i}").status_code == 200
+    assert len(compressor.assets) == MAX_CACHED_ASSETS
+    assert f"{script}?m=0" not in compressor.assets
+    assert f"{script}?m={MAX_CACHED_ASSETS + 9}" in compressor.assets
+
+def test_cached_response_not_stored_again(mock_model):
+    """
+    Test that answers served from the cache keep the cached body with its compressed variants.
+    """
+
+    app = Dash(__name__)
+    app.layout = html.Div([dcc.Graph(id="contour-graph", figure=mock_model.update_contour_figure())])
+    controller = Controller(app, mock_model)
+    controller.register_compression()
+    compressor = controller.compressor
+    compressed_client = app.server.test_client()
+
+    compressed_client.get("/_dash-layout", headers={"Accept-Encoding": "identity"})
+    compressed_client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    entry = compressor.pages["/_dash-layout"]
+
+    for encoding in ("identity", "identity", "gzip"):
+        assert compressed_client.get("/_dash-layout", headers={"Accept-Encoding": encoding}).status_code == 200
+    assert compressor.pages["/_dash-layout"] is entry
+    assert set(entry.variants) == {None, "gzip"}
+
+def test_index_and_scripts_cached(compressed_client):
+    """
+    Test that the index page and the scripts it loads are served compressed with ETags.
+    """
+
+    index = compressed_client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert index.status_code == 200
+    html_page = gzip.decompress(index.data).decode()
+
+    script = html_page.split('<script src="')[1].split('"')[0]
+    response = compressed_client.get(script, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    revalidated = compressed_client.get(script, headers={"If-None-Match": response.headers["ETag"], "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+
+def test_dynamic_responses_compressed(compressed_client):
+    """
+    Test that large dynamic responses are compressed without ETag and streamed exports are left untouched.
+    """
+
+    points = [[10.0 + i / 10, 30.0] for i in range(100)]
+    response = compressed_client.post("/api/points", json={"points": points}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "ETag" not in response.headers
+    assert len(gzip.decompress(response.data)) > 1024
+
+    small = compressed_client.post("/api/points", json={"points": [[10.0, 30.0]]}, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+    export = compressed_client.get("/api/grids?mesh_size=1.0", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in export.headers
+    assert export.data[:6] == b"\x93NUMPY"
@@ -0,0 +1,119 @@
+"""
+Module for testing the downsampling of time series.
+"""
+
+import pytest
+import numpy as np
+from model.downsample import downsample, lttb, minmax
+
+@pytest.fixture
+def series():
+    """
+    Return noisy periodic series with a single spike.
+    """
+
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=float)
+    y = np.sin(x / 200) + rng.normal(0, 0.05, len(x))
+    y[3210] = 10.0
+    return x, y
+
+@pytest.mark.parametrize("method", [
+    ("lttb"),
+    ("minmax")
+])
+def test_downsample(series, method):
+    """
+    Test that downsampling bounds the number of points and keeps the extremes.
+    """
+
+    x, y = series
+    indices = downsample(x, y, 200, method)
+
+    assert len(indices) <= 200
+    assert np.all(np.diff(indices) > 0)
+    assert 3210 in indices
+
+def test_minmax_envelope(series):
+    """
+    Test that min/max bucketing keeps the global minimum and maximum.
+    """
+
+    x, y = series
+    indices = minmax(x, y, 200)
+
+    assert np.argmin(y) in indices
+    assert np.argmax(y) in indices
+
+def test_lttb_endpoints(series):
+    """
+    Test that LTTB keeps the first and last point and returns exactly threshold points.
+    """
+
+    x, y = series
+    indices = lttb(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0
+    assert indices[-1] == len(x) - 1
+
+@pytest.mark.parametrize("threshold", [
+    (2),
+    (5000),
+    (10000)
+])
+def test_no_downsampling(series, threshold):
+    """
+    Test that short series or too small thresholds are returned unchanged.
+    """
+
+    x, y = series
+
+    assert len(lttb(x, y, threshold)) == len(x)
+    assert len(minmax(x, y, threshold)) == len(x)
+    assert len(downsample(x, y, 100, "none")) == len(x)
+
+@pytest.mark.parametrize("method", [
+    ("lttb"),
+    ("minmax")
+])
+def test_downsample_nan(series, method):
+    """
+    Test that NaN gaps neither hide the extremes nor break the selection of later buckets.
+    """
+
+    x, y = series
+    y[0] = np.nan
+    y[1000:1600] = np.nan
+    y[::7] = np.nan
+    indices = downsample(x, y, 200, method)
+
+    assert len(indices) <= 200
+    assert np.all(np.diff(indices) > 0)
+    assert 3210 in indices
+    assert np.any((indices >= 1000) & (indices < 1600))
+    assert np.isfinite(y[indices[indices >= 1600]]).all()
+
+def test_minmax_envelope_nan(series):
+    """
+    Test that min/max bucketing keeps the global extremes of a series with NaN.
+    """
+
+    x, y = series
+    y[1000:1600] = np.nan
+    y[::7] = np.nan
+    indices = minmax(x, y, 200)
+
+    assert np.nanargmin(y) in indices
+    assert np.nanargmax(y) in indices
+
+def test_downsample_all_nan(series):
+    """
+    Test that a series without data is downsampled without errors.
+    """
+
+    x, y = series
+    y[:] = np.nan
+
+    assert len(lttb(x, y, 100)) == 100
+    assert len(minmax(x, y, 100)) == 50
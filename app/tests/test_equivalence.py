@@ -0,0 +1,311 @@
+"""
+Module for testing numerical equivalence of accelerated extrapolation paths against golden reference grids.
+
+Reference grids are calculated by fitting a fresh regressor on every slice in float64 and stored in tests/golden.
+GBR may pick a different split of equally good candidates when targets are rounded, so its reduced precision paths
+are compared both with the float64 reference, which bounds the drift, and with references fitted on the cube
+stored in the same precision, which checks that nothing else than the rounded input changes the result.
+Regenerate them with: python3 -m tests.test_equivalence
+Set EQUIVALENCE_REPORT_DIR to save error maps of all compared paths.
+"""
+
+import os
+import json
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.svm import SVR
+from sklearn.ensemble import GradientBoostingRegressor
+from model.model import Model
+from model.storage import store
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+MODEL_PARAMS = {
+    "knn_model_params": {"n_neighbors": 5, "algorithm": "auto", "weights": "distance"},
+    "svr_model_params": {"C": 10, "kernel": "rbf", "degree": 4, "gamma": "auto"},
+    "gbr_model_params": {"learning_rate": 0.1, "n_estimators": 50, "subsample": 1.0, "random_state": 0}
+}
+
+# (maximum, root mean square) error relative to the range of the quantity, SVR is limited by its solver tolerance.
+# GBR fitted on rounded targets shifts whole regions when another split wins, on the golden cases by up to
+# 0.13 of the range at a point and 0.019 in RMS
+TOLERANCES = {
+    "float64": {0: (1e-9, 1e-9), 1: (1e-9, 1e-9), 2: (1e-9, 1e-9)},
+    "float32": {0: (1e-6, 1e-6), 1: (1e-3, 1e-4), 2: (0.15, 0.025)},
+    "int16": {0: (1e-4, 1e-4), 1: (1e-3, 1e-4), 2: (0.15, 0.025)}
+}
+
+# tolerances of GBR against the reference fitted on the rounded cube, limited by storage of the grids in the precision
+GBR_REDUCED_TOLERANCES = {"float32": (1e-6, 1e-6), "int16": (1e-4, 1e-4)}
+
+REDUCED_PRECISIONS = ["float32", "int16"]
+
+CASES = ["sample", "synthetic"]
+
+
+def sample_case():
+    """
+    Return stations, cube and selected times of the sample dataset.
+    """
+
+    data_dir = os.path.join(os.path.dirname(GOLDEN_DIR), "..", "model", "data")
+    stations = pd.read_csv(os.path.join(data_dir, "sample_stations.csv")).values
+    cube = np.load(os.path.join(data_dir, "sample_data.npy"))
+
+    return stations, cube, [0, 5, 10]
+
+def synthetic_case():
+    """
+    Return random stations with smooth fields of two quantities in four forecast times.
+    """
+
+    rng = np.random.default_rng(42)
+    stations = np.round(rng.uniform([12.0, 47.0], [19.0, 51.0], size=(40, 2)), 2)
+    lon, lat = stations[:, 0], stations[:, 1]
+    cube = np.stack([
+        np.stack([
+            15 + 8 * np.sin(lon / 2 + t / 3) * np.cos(lat - t / 5),
+            np.clip(50 + 40 * np.cos(lon + lat + t), 0, 100)
+        ], axis=-1)
+        for t in range(4)
+    ])
+
+    return stations, cube, [0, 1, 2, 3]
+
+def mesh(stations, mesh_size=0.2, margin=0.5):
+    """
+    Return x and y axes of the mesh covering the stations, the same as Model.build_range.
+    """
+
+    x_min, y_min = stations.min(axis=0) - margin
+    x_max, y_max = stations.max(axis=0) + margin
+    xrange = np.linspace(x_min, x_max, num=int((x_max - x_min) / mesh_size) + 1)
+    yrange = np.linspace(y_min, y_max, num=int((y_max - y_min) / mesh_size) + 1)
+
+    return xrange, yrange
+
+def reference_grids(stations, cube, xrange, yrange, times, models=(0, 1, 2)):
+    """
+    Fit a fresh regressor on every slice and return planes in the format (model, time, quantity, y, x).
+    The cube may be stored in reduced precision, its slices are fitted as they are read from the storage.
+    """
+
+    xx, yy = np.meshgrid(xrange, yrange)
+    grid_input = np.c_[xx.ravel(), yy.ravel()]
+    regressors = [
+        lambda: KNeighborsRegressor(**MODEL_PARAMS["knn_model_params"]),
+        lambda: SVR(**MODEL_PARAMS["svr_model_params"]),
+        lambda: GradientBoostingRegressor(**MODEL_PARAMS["gbr_model_params"])
+    ]
+
+    grids = np.empty((len(models), len(times), cube.shape[2]) + xx.shape)
+    for i, ex_model in enumerate(models):
+        for j, t in enumerate(times):
+            for quantity in range(cube.shape[2]):
+                regressor = regressors[ex_model]().fit(stations, cube[t, :, quantity])
+                grids[i, j, quantity] = regressor.predict(grid_input).reshape(xx.shape)
+
+    return grids
+
+def write_golden(name):
+    """
+    Calculate and store golden reference grids of the case.
+    """
+
+    stations, cube, times = sample_case() if name == "sample" else synthetic_case()
+    xrange, yrange = mesh(stations)
+
+    reduced = {
+        f"gbr_{precision}": reference_grids(stations, store(cube, precision), xrange, yrange, times, (2,))[0]
+        for precision in REDUCED_PRECISIONS
+    }
+
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    np.savez_compressed(
+        os.path.join(GOLDEN_DIR, f"{name}.npz"),
+        stations=stations,
+        cube=cube,
+        times=np.array(times),
+        x=xrange,
+        y=yrange,
+        grids=reference_grids(stations, cube, xrange, yrange, times),
+        params=json.dumps(MODEL_PARAMS),
+        **reduced
+    )
+
+def load_golden(name):
+    """
+    Load golden reference of the case.
+    """
+
+    with np.load(os.path.join(GOLDEN_DIR, f"{name}.npz")) as golden:
+        return {key: golden[key] for key in golden.files}
+
+def make_model(golden, precision="float64"):
+    """
+    Create Model holding the golden case data in the given precision with the golden model parameters.
+    """
+
+    model = Model()
+    for key, params in json.loads(str(golden["params"])).items():
+        setattr(model.parser, key, params)
+    model.parser.storage_settings = {"precision": precision}
+    model.stations_pos = pd.DataFrame(golden["stations"], columns=["lon", "lat"])
+    model.data = store(golden["cube"], precision)
+    model.clear_cache()
+
+    return model
+
+def path_calc_grid(model, golden, ex_model):
+    return np.stack([
+        np.stack([model.calc_grid(golden["x"], golden["y"], int(t), q, ex_model) for q in range(golden["cube"].shape[2])])
+        for t in golden["times"]
+    ])
+
+def path_calc_grids(model, golden, ex_model):
+    grids = [model.calc_grids(golden["x"], golden["y"], q, ex_model) for q in range(golden["cube"].shape[2])]
+    return np.stack(grids, axis=1)[golden["times"]]
+
+def path_iter_grids(model, golden, ex_model):
+    return np.stack(list(model.iter_grids(golden["x"], golden["y"], ex_model)))[golden["times"]]
+
+def path_predict_points(model, golden, ex_model):
+    xx, yy = np.meshgrid(golden["x"], golden["y"])
+    values = model.predict_points(np.c_[xx.ravel(), yy.ravel()], ex_model)[golden["times"]]
+    return values.transpose(0, 2, 1).reshape(values.shape[0], values.shape[2], *xx.shape)
+
+def path_contour_figure(model, golden, ex_model):
+    model.build_range = lambda *args, **kwargs: (golden["x"], golden["y"])
+    model.ex_model = ex_model
+    grids = []
+    for t in golden["times"]:
+        model.time = int(t)
+        planes = []
+        for quantity in range(golden["cube"].shape[2]):
+            model.quantity = quantity
+            planes.append(np.asarray(model.update_contour_figure().data[0].z))
+        grids.append(np.stack(planes))
+    return np.stack(grids)
+
+PATHS = {
+    "calc_grid": path_calc_grid,
+    "calc_grids": path_calc_grids,
+    "iter_grids": path_iter_grids,
+    "predict_points": path_predict_points,
+    "contour_figure": path_contour_figure
+}
+
+REFERENCE_TIMES = {}
+
+
+def reference_time(name, golden, ex_model):
+    """
+    Return time of the reference calculation of the case and model, measured once.
+    """
+
+    if (name, ex_model) not in REFERENCE_TIMES:
+        start = time.perf_counter()
+        reference_grids(golden["stations"], golden["cube"], golden["x"], golden["y"], golden["times"], (ex_model,))
+        REFERENCE_TIMES[(name, ex_model)] = time.perf_counter() - start
+
+    return REFERENCE_TIMES[(name, ex_model)]
+
+def compare(name, path, ex_model, precision, equivalence_report, reference_precision="float64"):
+    """
+    Run the fast path on the golden case, record errors and speedup and return maximum and RMS relative error.
+    GBR may be compared with the reference fitted on the cube stored in the reduced precision instead of float64.
+    """
+
+    golden = load_golden(name)
+    model = make_model(golden, precision)
+
+    start = time.perf_counter()
+    grids = PATHS[path](model, golden, ex_model)
+    elapsed = time.perf_counter() - start
+
+    if reference_precision == "float64":
+        reference = golden["grids"][ex_model]
+    else:
+        reference = golden[f"gbr_{reference_precision}"]
+    error = np.abs(grids - reference)
+    ranges = np.ptp(golden["cube"], axis=(0, 1))
+    ranges[ranges == 0] = 1.0
+    relative_error = float((error.max(axis=(0, 2, 3)) / ranges).max())
+    rms_error = float((np.sqrt((error ** 2).mean(axis=(0, 2, 3))) / ranges).max())
+
+    report_dir = os.environ.get("EQUIVALENCE_REPORT_DIR")
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+        np.savez_compressed(
+            os.path.join(report_dir, f"{name}_{path}_{ex_model}_{precision}_{reference_precision}.npz"), error=error
+        )
+
+    equivalence_report.append({
+        "case": name,
+        "path": path,
+        "model": ["kNN", "SVR", "GBR"][ex_model],
+        "precision": precision,
+        "reference": reference_precision,
+        "max_abs": float(error.max()),
+        "max_rel": relative_error,
+        "rms_rel": rms_error,
+        "speedup": reference_time(name, golden, ex_model) / elapsed
+    })
+
+    return relative_error, rms_error
+
+
+@pytest.mark.parametrize("name", CASES)
+@pytest.mark.parametrize("path", list(PATHS))
+@pytest.mark.parametrize("ex_model", [0, 1, 2])
+def test_fast_paths(name, path, ex_model, equivalence_report):
+    """
+    Test that all grid paths reproduce the golden reference in full precision.
+    """
+
+    max_error, rms_error = compare(name, path, ex_model, "float64", equivalence_report)
+
+    assert max_error <= TOLERANCES["float64"][ex_model][0]
+    assert rms_error <= TOLERANCES["float64"][ex_model][1]
+
+@pytest.mark.parametrize("name", CASES)
+@pytest.mark.parametrize("precision", REDUCED_PRECISIONS)
+@pytest.mark.parametrize("ex_model", [0, 1, 2])
+def test_reduced_precision(name, precision, ex_model, equivalence_report):
+    """
+    Test that grids calculated from data and cache in reduced precision stay within per-model tolerances.
+    """
+
+    max_error, rms_error = compare(name, "calc_grid", ex_model, precision, equivalence_report)
+
+    assert max_error <= TOLERANCES[precision][ex_model][0]
+    assert rms_error <= TOLERANCES[precision][ex_model][1]
+
+    if ex_model == 2:
+        max_error, rms_error = compare(name, "calc_grid", ex_model, precision, equivalence_report, precision)
+
+        assert max_error <= GBR_REDUCED_TOLERANCES[precision][0]
+        assert rms_error <= GBR_REDUCED_TOLERANCES[precision][1]
+
+@pytest.mark.parametrize("name", CASES)
+def test_golden_inputs(name):
+    """
+    Test that the stored golden inputs match the generated cases.
+    """
+
+    golden = load_golden(name)
+    stations, cube, times = sample_case() if name == "sample" else synthetic_case()
+
+    assert np.allclose(golden["stations"], stations)
+    assert np.allclose(golden["cube"], cube)
+    assert np.array_equal(golden["times"], times)
+    assert json.loads(str(golden["params"])) == MODEL_PARAMS
+
+
+if __name__ == "__main__":
+    for case in CASES:
+        write_golden(case)
+        print(f"Written golden reference: {case}")
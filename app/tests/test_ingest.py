@@ -0,0 +1,87 @@
+"""
+Module for testing ingestion of raw observations into the data cube.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from model.ingest import ingest
+from model.registry import DatasetRegistry
+
+@pytest.fixture
+def observations(tmp_path):
+    """
+    Write shuffled observations of 3 stations in 5 times with missing rows and values, return path and expected cube.
+    """
+
+    rng = np.random.default_rng(0)
+    stations = np.array([[16.5, 49.1], [14.2, 50.0], [17.3, 48.3]])
+    cube = rng.random((5, 3, 2))
+    cube[1, 2, 0] = np.nan
+
+    rows = []
+    for time in range(5):
+        for station, (lon, lat) in enumerate(stations):
+            if (time, station) != (3, 1):
+                rows.append([time * 6 + 12, lon, lat, cube[time, station, 0], cube[time, station, 1]])
+    cube[3, 1, :] = np.nan
+
+    frame = pd.DataFrame(rows, columns=["time", "lon", "lat", "t2m", "rh"]).sample(frac=1, random_state=0)
+    path = tmp_path / "observations.csv"
+    frame.to_csv(path, index=False)
+
+    # stations are sorted by position
+    order = np.lexsort((stations[:, 1], stations[:, 0]))
+    return path, stations[order], cube[:, order]
+
+def test_ingest(observations, tmp_path):
+    """
+    Test that the streamed cube matches the observations and is opened as a memory map by the registry.
+    """
+
+    path, stations, cube = observations
+    progress = []
+    stats = ingest(path, str(tmp_path), "raw", ["t2m", "rh"], chunk_rows=4,
+                   progress=lambda rows, seconds: progress.append(rows))
+
+    assert stats["rows"] == 14
+    assert stats["shape"] == (5, 3, 2)
+    assert progress == [4, 8, 12, 14]
+
+    stations_pos, data = DatasetRegistry(str(tmp_path)).open("raw")
+    assert np.allclose(stations_pos[["lon", "lat"]].values, stations)
+    assert np.allclose(data, cube, equal_nan=True)
+    assert isinstance(data.base, np.memmap)
+    assert list(tmp_path.glob("*.part")) == []
+
+def test_ingest_dates(tmp_path):
+    """
+    Test that dates are placed on the grid of the time step.
+    """
+
+    frame = pd.DataFrame({
+        "time": ["2024-05-01 00:00", "2024-05-01 12:00", "2024-05-01 06:00"],
+        "lon": [16.0, 16.0, 17.0],
+        "lat": [49.0, 49.0, 48.0],
+        "t2m": [1.0, 3.0, 2.0]
+    })
+    frame.to_csv(tmp_path / "dates.csv", index=False)
+
+    ingest(tmp_path / "dates.csv", str(tmp_path), "dates", ["t2m"], step=6)
+    data = np.load(tmp_path / "dates_data.npy")
+
+    assert data.shape == (3, 2, 1)
+    assert np.allclose(data[:, :, 0], [[1.0, np.nan], [np.nan, 2.0], [3.0, np.nan]], equal_nan=True)
+
+def test_ingest_off_grid(tmp_path):
+    """
+    Test that times outside the grid of the time step are refused and no files are left behind.
+    """
+
+    pd.DataFrame({"time": [0, 6, 8], "lon": [16.0] * 3, "lat": [49.0] * 3, "t2m": [1.0] * 3}).to_csv(
+        tmp_path / "off.csv", index=False
+    )
+
+    with pytest.raises(ValueError):
+        ingest(tmp_path / "off.csv", str(tmp_path), "off", ["t2m"], step=6)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["off.csv"]
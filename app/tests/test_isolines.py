@@ -0,0 +1,77 @@
+"""
+Module for testing extraction and simplification of isolines.
+"""
+
+import pytest
+import numpy as np
+from model.isolines import simplify, isobands
+
+def field(mesh_size):
+    """
+    Return axes and smooth plane sampled with the given mesh size.
+    """
+
+    xrange = np.arange(12.0, 19.0 + mesh_size / 2, mesh_size)
+    yrange = np.arange(47.0, 51.0 + mesh_size / 2, mesh_size)
+    xx, yy = np.meshgrid(xrange, yrange)
+
+    return xrange, yrange, 15 + 8 * np.sin(xx / 2) * np.cos(yy - 48)
+
+def area(x, y):
+    """
+    Return signed area of NaN separated rings, holes run in the opposite direction and are subtracted.
+    """
+
+    total = 0.0
+    for ring in np.split(np.c_[x, y], np.flatnonzero(np.isnan(x))):
+        ring = ring[~np.isnan(ring[:, 0])]
+        total += 0.5 * np.sum(ring[:-1, 0] * ring[1:, 1] - ring[1:, 0] * ring[:-1, 1])
+
+    return total
+
+def test_simplify():
+    """
+    Test that collinear points are dropped and points further than tolerance are kept.
+    """
+
+    line = np.array([[0.0, 0.0], [1.0, 0.001], [2.0, 0.0], [3.0, 1.0], [4.0, 0.0]])
+
+    assert np.array_equal(simplify(line, 0.01), line[[0, 2, 3, 4]])
+    assert np.array_equal(simplify(line, 2.0), line[[0, 4]])
+    assert np.array_equal(simplify(line, 0.0), line)
+
+def test_isobands_cover_plane():
+    """
+    Test that the bands tile the whole plane and every band lies between its levels.
+    """
+
+    xrange, yrange, Z = field(0.05)
+    levels = np.linspace(Z.min(), Z.max(), 8)
+    bands = isobands(Z, xrange, yrange, levels, 0.0)
+
+    assert len(bands) == 7
+    assert np.isclose(sum(area(x, y) for x, y in bands), 7.0 * 4.0)
+
+    x, y = bands[3]
+    ix = np.clip(np.searchsorted(xrange, x[~np.isnan(x)]), 0, len(xrange) - 1)
+    iy = np.clip(np.searchsorted(yrange, y[~np.isnan(y)]), 0, len(yrange) - 1)
+    assert np.all(np.abs(Z[iy, ix] - (levels[3] + levels[4]) / 2) < levels[4] - levels[3])
+
+@pytest.mark.parametrize("tolerance", [
+    (0.005),
+    (0.02)
+])
+def test_isobands_payload(tolerance):
+    """
+    Test that the size of simplified bands depends on the contours rather than on the mesh size.
+    """
+
+    sizes = []
+    for mesh_size in (0.05, 0.01):
+        xrange, yrange, Z = field(mesh_size)
+        bands = isobands(Z, xrange, yrange, np.linspace(Z.min(), Z.max(), 8), tolerance)
+        sizes.append(sum(len(x) for x, _ in bands))
+        assert np.isclose(sum(area(x, y) for x, y in bands), 7.0 * 4.0, rtol=1e-2)
+
+    assert sizes[1] < 2 * sizes[0]
+    assert sizes[1] < Z.size / 50
@@ -0,0 +1,73 @@
+"""
+Module for testing the load test harness.
+"""
+
+import pytest
+import numpy as np
+from app import WeatherApp
+from benchmarks.loadtest import SessionScript, layout_values, parse_outputs, parse_workers, summarize
+
+@pytest.fixture(scope="module")
+def client():
+    """
+    Fixture to create a test client of the application server.
+    """
+
+    return WeatherApp().app.server.test_client()
+
+
+def test_parse_outputs():
+    """
+    Test parsing of single and multiple callback outputs.
+    """
+
+    assert parse_outputs("contour-graph.figure") == [{"id": "contour-graph", "property": "figure"}]
+    assert parse_outputs("..graph-a.figure...graph-b.figure..") == [
+        {"id": "graph-a", "property": "figure"},
+        {"id": "graph-b", "property": "figure"}
+    ]
+
+@pytest.mark.parametrize("workers, expected", [
+    ("threads", (True, 1)),
+    ("processes:4", (False, 4))
+])
+def test_parse_workers(workers, expected):
+    """
+    Test parsing of worker configurations.
+    """
+
+    assert parse_workers(workers) == expected
+
+    with pytest.raises(ValueError):
+        parse_workers("processes:0")
+
+def test_summarize():
+    """
+    Test the summary of measured requests.
+    """
+
+    result = summarize(list(np.linspace(0.001, 0.1, 100)), 25, 5.0)
+
+    assert result["requests"] == 125
+    assert result["throughput"] == 25.0
+    assert result["p50"] == pytest.approx(50.5)
+    assert result["p99"] == pytest.approx(99.01)
+    assert result["error_rate"] == 0.2
+
+def test_session_script(client):
+    """
+    Test that all generated session requests are accepted by the Dash server.
+    """
+
+    dependencies = client.get("/_dash-dependencies").get_json()
+    values = layout_values(client.get("/_dash-layout").get_json())
+
+    assert values["slider-time"] == 0
+    assert "dropdown-station" in values
+
+    script = SessionScript(dependencies, values, seed=1)
+    payloads = [payload for _ in range(5) for payload in script.action(4, 4, 10)]
+
+    assert payloads
+    for payload in payloads:
+        assert client.post("/_dash-update-component", json=payload).status_code == 200
@@ -2,39 +2,27 @@
 Module for testing the Model Class.
 """
 
+import threading
 import pytest
 import numpy as np
 import pandas as pd
-from flexmock import flexmock
+from threadpoolctl import threadpool_info
 from model.model import Model
-from model.parser import Parser
+from model.storage import store
+from model.registry import DatasetRegistry
 
 @pytest.fixture
-def mock_parser():
+def mock_parser(mock_parser):
     """
-    Fixture to create a mock Parser without calling the constructor using FlexMock.
+    Fixture to extend the shared mock Parser with a longer forecast range.
     """
 
-    parser = flexmock(Parser)
-
-    parser.quantities = ["Air Temperature", "Ground Temperature", "Air Humidity", "Wind Direction", "Wind"]
-    parser.graph_colors = ["blue", "red", "black", "gray", "maroon"]
-    parser.contour_color_schemes = ["viridis", "inferno", "magma", "cividis", "plasma"]
-    parser.forecast_settings = {
+    mock_parser.forecast_settings = {
         "forecast_range": 20,
         "forecast_step": 6
     }
-    parser.default_view = {
-        "quantity": "Air Temperature",
-        "station": 0,
-        "time": 0,
-        "model": 0
-    }
-    parser.knn_model_params = {"n_neighbors": 2, "algorithm": "auto", "weights": "uniform"}
-    parser.svr_model_params = {"C": 1.0, "kernel": "rbf", "gamma": "scale"}
-    parser.gbr_model_params = {"learning_rate": 0.1, "n_estimators": 100, "subsample": 1.0}
 
-    return parser
+    return mock_parser
 
 @pytest.fixture
 def mock_model(mock_parser):
@@ -139,3 +127,508 @@ def test_update_graph_figure(mock_model, quantity_idx, expected_color):
     assert len(fig.data) == 1
     assert fig.data[0].line.color == expected_color
     assert fig.data[0].type == "scatter"
+
+def test_get_regressor_cache(mock_model):
+    """
+    Test that fitted regressors are cached per slice.
+    """
+
+    regressor = mock_model.get_regressor(1, 2, 1)
+
+    assert mock_model.get_regressor(1, 2, 1) is regressor
+    assert mock_model.get_regressor(2, 2, 1) is not regressor
+
+    mock_model.clear_cache()
+    assert mock_model.get_regressor(1, 2, 1) is not regressor
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_predict_points(mock_model, model):
+    """
+    Test the predict_points method against regressors fitted on single slices.
+    """
+
+    points = np.array([[12.0, 35.0], [20.0, 40.0], [33.3, 55.5]])
+    values = mock_model.predict_points(points, model)
+
+    assert values.shape == (20, 3, 5)
+
+    for time in (0, 7, 19):
+        for quantity in range(5):
+            regressor = mock_model.get_regressor(time, quantity, model)
+            assert np.allclose(values[time, :, quantity], regressor.predict(points))
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_iter_grids(mock_model, model):
+    """
+    Test that iter_grids yields the same planes as calc_grid.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    grids = list(mock_model.iter_grids(xrange, yrange, model))
+
+    assert len(grids) == 20
+    for time in (0, 19):
+        for quantity in range(5):
+            Z = mock_model.calc_grid(xrange, yrange, time, quantity, model)
+            assert grids[time].shape == (5,) + Z.shape
+            assert np.allclose(grids[time][quantity], Z)
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_calc_grids(mock_model, model):
+    """
+    Test that the batched calc_grids matches calc_grid of every time step.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    grids = mock_model.calc_grids(xrange, yrange, 3, model)
+
+    assert grids.shape == (20, len(yrange), len(xrange))
+
+    for time in (0, 10, 19):
+        xx, yy = np.meshgrid(xrange, yrange)
+        regressor = mock_model.get_regressor(time, 3, model)
+        Z = regressor.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
+        assert np.allclose(grids[time], Z)
+
+def test_update_animation_figure(mock_model):
+    """
+    Test the update_animation_figure method.
+    """
+
+    mock_model.time = 4
+    fig = mock_model.update_animation_figure()
+
+    assert fig.data[0].type == "contour"
+    assert len(fig.frames) == 20
+    assert all(frame.data[0].type == "contour" for frame in fig.frames)
+    assert np.allclose(fig.data[0].z, fig.frames[4].data[0].z)
+    assert fig.layout.sliders[0].active == 4
+    assert len(fig.layout.sliders[0].steps) == 20
+
+@pytest.mark.parametrize("precision, model, tolerance", [
+    ("float32", 0, 1e-6),
+    ("float32", 1, 5e-3),
+    ("float32", 2, 1e-4),
+    ("int16", 0, 1e-4),
+    ("int16", 1, 5e-3),
+    ("int16", 2, 1e-3)
+])
+def test_calc_grid_precision(mock_model, precision, model, tolerance):
+    """
+    Test the accuracy of planes calculated from data and grids stored in reduced precision.
+    Tolerance of SVR is given by the tolerance of its solver rather than by the precision.
+    """
+
+    data = mock_model.data
+    xrange, yrange = mock_model.build_range(mesh_size=0.5, margin=0.5)
+    reference = mock_model.calc_grid(xrange, yrange, 5, 1, model)
+
+    mock_model.parser.storage_settings = {"precision": precision}
+    mock_model.data = store(data, precision)
+    mock_model.clear_cache()
+    Z = mock_model.calc_grid(xrange, yrange, 5, 1, model)
+
+    if model == 2:
+        # gradient boosting may pick different splits, compare the station values instead
+        stations = mock_model.get_regressor(5, 1, model).predict(mock_model.stations_pos.values)
+        assert np.max(np.abs(stations - data[5, :, 1])) < 0.1
+    else:
+        assert np.max(np.abs(Z - reference)) < tolerance
+    assert Z.shape == reference.shape
+
+def test_memory_usage(mock_model):
+    """
+    Test the memory accounting of the data cube, grids and regressors.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    usage = mock_model.memory_usage()
+    assert usage["cube"] == mock_model.data.nbytes
+    assert usage["grids"] == 0
+    assert usage["regressors"] == 0
+
+    Z = mock_model.calc_grid(xrange, yrange, 0, 0, 1)
+    usage = mock_model.memory_usage()
+    assert usage["grids"] == Z.nbytes
+    assert usage["regressors"] > 0
+    assert usage["caches"] == mock_model.cache_bytes(mock_model.run)
+    assert usage["caches"] >= usage["grids"] + usage["regressors"]
+
+    mock_model.parser.storage_settings = {"precision": "int16"}
+    mock_model.data = store(mock_model.data, "int16")
+    mock_model.clear_cache()
+    mock_model.calc_grid(xrange, yrange, 0, 0, 1)
+    assert mock_model.memory_usage()["grids"] < Z.nbytes / 3
+    assert mock_model.memory_usage()["cube"] < usage["cube"] / 3
+
+def test_update_graph_figure_downsampling(mock_model):
+    """
+    Test that long series are downsampled to the width of the graph and zoomed range is sent in detail.
+    """
+
+    mock_model.parser.forecast_settings = {"forecast_range": 2000, "forecast_step": 1}
+    mock_model.data = np.random.rand(2000, 4, 5)
+
+    fig = mock_model.update_graph_figure(1)
+    assert len(fig.data[0].x) == 2000
+
+    fig = mock_model.update_graph_figure(1, width=300)
+    assert len(fig.data[0].x) == 300
+    assert fig.data[0].x[0] == 0
+    assert fig.data[0].x[-1] == 1999
+
+    fig = mock_model.update_graph_figure(1, width=300, x_range=[100.5, 250.5])
+    assert np.array_equal(fig.data[0].x, np.arange(100, 252))
+    assert np.allclose(fig.data[0].y, mock_model.data[100:252, 0, 1])
+    assert list(fig.layout.xaxis.range) == [100.5, 250.5]
+
+def test_select_run(mock_model, tmp_path):
+    """
+    Test switching between forecast runs and eviction of their caches.
+    """
+
+    for name, n_stations in [("run_a", 4), ("run_b", 3)]:
+        pd.DataFrame({'lon': np.arange(n_stations) * 10.0, 'lat': np.arange(n_stations) * 5.0 + 30.0}).to_csv(
+            tmp_path / f"{name}_stations.csv", index=False
+        )
+        np.save(tmp_path / f"{name}_data.npy", np.random.rand(20, n_stations, 5))
+
+    mock_model.registry = DatasetRegistry(
+        str(tmp_path), on_evict=mock_model.drop_cache, cache_bytes=mock_model.cache_bytes
+    )
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+
+    mock_model.station = 3
+    mock_model.select_run("run_a")
+    Z = mock_model.calc_grid(xrange, yrange, 0, 0, 0)
+    assert mock_model.station == 3
+
+    mock_model.select_run("run_b")
+    assert mock_model.run == "run_b"
+    assert mock_model.station == 2
+    assert len(mock_model.grids) == 0
+    assert not np.allclose(mock_model.calc_grid(xrange, yrange, 0, 0, 0), Z)
+
+    mock_model.select_run("run_a")
+    assert len(mock_model.grids) == 1
+
+    mock_model.registry.memory_budget = mock_model.registry.run_bytes("run_a")
+    mock_model.registry.enforce_budget(keep="run_a")
+    assert "run_b" not in mock_model.caches
+    assert list(mock_model.registry.runs) == ["run_a"]
+
+def test_clamp_selection_short_run(mock_model, tmp_path):
+    """
+    Test that the selected time and window are limited to a run with fewer forecast times.
+    """
+
+    pd.DataFrame({'lon': [10.0, 12.0, 14.0], 'lat': [30.0, 31.0, 32.0]}).to_csv(tmp_path / "short_stations.csv", index=False)
+    np.save(tmp_path / "short_data.npy", np.random.rand(4, 3, 5))
+    mock_model.registry = DatasetRegistry(str(tmp_path), on_evict=mock_model.drop_cache, cache_bytes=mock_model.cache_bytes)
+
+    mock_model.window = (2, 15)
+    mock_model.select_run("short")
+    assert mock_model.window == (2, 3)
+    assert mock_model.time_labels() == {0: "0h", 1: "6h", 2: "12h", 3: "18h"}
+
+    mock_model.time = 8
+    mock_model.window = (6, 9)
+    mock_model.clamp_selection()
+    assert mock_model.time == 3
+    assert mock_model.window == (3, 3)
+    assert mock_model.update_contour_figure().data
+
+def test_snapshot_run_switch(mock_model, tmp_path):
+    """
+    Test that a calculation started before a switch of the run uses and caches data of its own run only.
+    """
+
+    for name, n_stations in [("run_a", 4), ("run_b", 3)]:
+        pd.DataFrame({'lon': np.arange(n_stations) * 10.0, 'lat': np.arange(n_stations) * 5.0 + 30.0}).to_csv(
+            tmp_path / f"{name}_stations.csv", index=False
+        )
+        np.save(tmp_path / f"{name}_data.npy", np.random.rand(20, n_stations, 5))
+    mock_model.registry = DatasetRegistry(str(tmp_path), on_evict=mock_model.drop_cache, cache_bytes=mock_model.cache_bytes)
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    key = (1, 0, 1) + mock_model.grid_key(xrange, yrange)
+
+    mock_model.select_run("run_a")
+    state = mock_model.snapshot()
+    mock_model.select_run("run_b")
+    Z = mock_model.calc_grid(xrange, yrange, 1, 0, 1, state)
+
+    assert key in mock_model.caches["run_a"]["grids"]
+    assert key not in mock_model.caches["run_b"]["grids"]
+
+    mock_model.select_run("run_a")
+    mock_model.clear_cache()
+    assert np.allclose(mock_model.calc_grid(xrange, yrange, 1, 0, 1), Z)
+
+def test_calc_grid_tight_budget_concurrent(mock_model):
+    """
+    Test that planes are returned even when the memory budget drops them right after they are cached.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=0.1, margin=0.5)
+    mock_model.registry.memory_budget = 1
+    errors = []
+
+    def request(time):
+        try:
+            for ex_model in (0, 1, 0, 1):
+                assert mock_model.calc_grid(xrange, yrange, time, 0, ex_model).shape == (len(yrange), len(xrange))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=request, args=(i % 3,)) for i in range(9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(mock_model.grids) == 0
+
+def test_enforce_budget_trims_current_run(mock_model):
+    """
+    Test that caches of the current run are trimmed in the LRU order when they exceed the memory budget.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=0.1, margin=0.5)
+    mesh_key = mock_model.grid_key(xrange, yrange)
+    Z = mock_model.calc_grid(xrange, yrange, 0, 0, 1)
+    base = mock_model.registry.run_bytes(mock_model.run) - mock_model.cache_bytes(mock_model.run)
+    mock_model.registry.memory_budget = base + mock_model.cache_bytes(mock_model.run) + 2 * Z.nbytes
+
+    for time in range(1, 5):
+        mock_model.calc_grid(xrange, yrange, time, 0, 1)
+        mock_model.calc_grid(xrange, yrange, 0, 0, 1)
+
+    assert mock_model.registry.run_bytes(mock_model.run) <= mock_model.registry.memory_budget
+    assert mock_model.run in mock_model.registry.runs
+    assert (0, 0, 1) + mesh_key in mock_model.grids
+    assert (4, 0, 1) + mesh_key in mock_model.grids
+    assert (1, 0, 1) + mesh_key not in mock_model.grids
+    assert set(mock_model.regressor_bytes) == set(mock_model.regressors)
+
+    mock_model.registry.memory_budget = base
+    mock_model.enforce_budget()
+    assert len(mock_model.grids) == 0
+    assert len(mock_model.recent) == 0
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_calc_grid_aggregation(mock_model, model):
+    """
+    Test that aggregated station values feed calc_grid and its cache like a regular time slice.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    mock_model.aggregation = "max"
+    mock_model.window = (3, 9)
+
+    assert mock_model.selected_time() == ("max", 3, 9)
+    assert np.allclose(mock_model.station_values(("max", 3, 9), 2), mock_model.data[3:10, :, 2].max(axis=0))
+
+    Z = mock_model.calc_grid(xrange, yrange, quantity=2, ex_model=model)
+    assert (("max", 3, 9), 2, model) + mock_model.grid_key(xrange, yrange) in mock_model.grids
+
+    regressor = mock_model.create_regressor(model)
+    regressor.fit(mock_model.stations_pos.values, mock_model.data[3:10, :, 2].max(axis=0))
+    assert Z.shape == (len(yrange), len(xrange))
+    if model != 2:
+        xx, yy = np.meshgrid(xrange, yrange)
+        assert np.allclose(Z, regressor.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape))
+
+def test_update_contour_figure_aggregation(mock_model):
+    """
+    Test that the contour figure displays the aggregated values.
+    """
+
+    mock_model.aggregation = "sum"
+    mock_model.window = (0, 19)
+    fig = mock_model.update_contour_figure()
+
+    assert fig.data[0].type == "contour"
+    assert fig.data[0].contours.end > 2.0
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_update_isoline_figure(mock_model, model):
+    """
+    Test that the isolines mode sends filled band polygons extracted once per plane instead of the dense plane.
+    """
+
+    mock_model.parser.contour_settings = {"mode": "isolines", "levels": 5, "simplify_tolerance": 0.01}
+    mock_model.ex_model = model
+    fig = mock_model.update_contour_figure()
+
+    bands = [trace for trace in fig.data if trace.fill == "toself"]
+    assert 1 <= len(bands) <= 5
+    assert all(trace.type == "scatter" and trace.line.width == 0 for trace in bands)
+    assert fig.data[len(bands)].marker.showscale
+    assert len(mock_model.isolines) == 1
+
+    xrange, yrange = mock_model.build_range()
+    Z = mock_model.calc_grid(xrange, yrange)
+    assert np.isclose(fig.data[len(bands)].marker.cmin, Z.min())
+    assert sum(len(trace.x) for trace in bands) < Z.size
+
+    assert mock_model.calc_isolines(xrange, yrange) is mock_model.calc_isolines(xrange, yrange)
+    assert mock_model.flights.stats()["isolines"]["executed"] == 1
+
+def test_calc_grid_coalescing(mock_model):
+    """
+    Test that concurrent requests for the same plane fit and predict only once.
+    """
+
+    xrange, yrange = mock_model.build_range(mesh_size=0.1, margin=0.5)
+    threads = [
+        threading.Thread(target=mock_model.calc_grid, args=(xrange, yrange, 2, 1, 1))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = mock_model.flights.stats()
+    assert stats["grid"]["executed"] == 1
+    assert stats["regressor"]["executed"] == 1
+    assert len(mock_model.grids) == 1
+    assert len(mock_model.regressors) == 1
+
+def test_thread_settings(mock_model):
+    """
+    Test that thread limits are applied to thread pools and kNN n_jobs.
+    """
+
+    mock_model.parser.thread_settings = {"blas_threads": 1, "openmp_threads": 1, "knn_n_jobs": 2}
+    mock_model.thread_limits_pid = None
+    mock_model.apply_thread_limits()
+
+    assert all(info["num_threads"] == 1 for info in threadpool_info() if info["user_api"] in ("blas", "openmp"))
+    assert mock_model.create_regressor(0).n_jobs == 2
+    assert mock_model.thread_limits_pid is not None
+
+    mock_model.parser.knn_model_params = {"n_neighbors": 2, "n_jobs": 3}
+    assert mock_model.create_regressor(0).n_jobs == 3
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_calc_grid_missing_stations(mock_model, model):
+    """
+    Test that slices with missing stations are fitted on the valid stations only.
+    """
+
+    mock_model.data[3:6, 1, 2] = np.nan
+    mock_model.data[8, 3, :] = np.nan
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    xx, yy = np.meshgrid(xrange, yrange)
+
+    for time in (3, 8):
+        Z = mock_model.calc_grid(xrange, yrange, time, 2, model)
+        valid = ~np.isnan(mock_model.data[time, :, 2])
+        regressor = mock_model.create_regressor(model)
+        regressor.fit(mock_model.stations_pos.values[valid], mock_model.data[time, valid, 2])
+
+        assert not np.isnan(Z).any()
+        if model != 2:
+            assert np.allclose(Z, regressor.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape))
+
+def test_knn_missing_stations(mock_model):
+    """
+    Test that kNN planes, batches and point queries reuse one neighbour search per station mask.
+    """
+
+    mock_model.data[3:6, 1, 2] = np.nan
+    mock_model.data[8, 3, :] = np.nan
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+    xx, yy = np.meshgrid(xrange, yrange)
+
+    grids = mock_model.calc_grids(xrange, yrange, 2, 0)
+    assert not np.isnan(grids).any()
+    assert sorted(mock_model.neighbors) == [0, 1, 2]
+    assert len(mock_model.weights) == 3
+
+    streamed = np.stack(list(mock_model.iter_grids(xrange, yrange, 0)))
+    points = mock_model.predict_points(np.c_[xx.ravel(), yy.ravel()], 0)
+    assert np.allclose(streamed[:, 2], grids)
+    assert np.allclose(points[:, :, 2].reshape(grids.shape), grids)
+
+    for time in (0, 4, 8):
+        regressor = mock_model.get_regressor(time, 2, 0)
+        assert np.allclose(grids[time], regressor.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape))
+
+    assert mock_model.calc_grid(xrange, yrange, 8, 4, 0).shape == xx.shape
+    assert len(mock_model.neighbors) == 3
+    assert mock_model.cache_bytes(mock_model.run) > sum(grid.nbytes for grid in mock_model.grids.values())
+
+def test_aggregation_missing_stations(mock_model):
+    """
+    Test that aggregated slices skip missing values and stations without any value in the window.
+    """
+
+    mock_model.data[3:6, 1, 2] = np.nan
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+
+    assert np.isnan(mock_model.station_values(("mean", 3, 5), 2)[1])
+    assert np.isclose(mock_model.station_values(("mean", 3, 6), 2)[1], mock_model.data[6, 1, 2])
+
+    Z = mock_model.calc_grid(xrange, yrange, ("mean", 3, 5), 2, 0)
+    assert not np.isnan(Z).any()
+    assert mock_model.mask_id(("mean", 3, 5), 2) == mock_model.mask_id(4, 2)
+
+@pytest.mark.parametrize("model", [
+    (0),
+    (1),
+    (2)
+])
+def test_empty_slice(mock_model, model):
+    """
+    Test that a slice without any valid station gives NaN planes and values while other slices are calculated.
+    """
+
+    mock_model.data[7, :, 3] = np.nan
+    xrange, yrange = mock_model.build_range(mesh_size=1.0, margin=0.5)
+
+    grids = mock_model.calc_grids(xrange, yrange, 3, model)
+    assert np.isnan(grids[7]).all()
+    assert not np.isnan(np.delete(grids, 7, axis=0)).any()
+    assert np.isnan(mock_model.calc_grid(xrange, yrange, 7, 3, model)).all()
+
+    streamed = np.stack(list(mock_model.iter_grids(xrange, yrange, model)))
+    assert np.allclose(streamed[:, 3], grids, equal_nan=True)
+    assert not np.isnan(streamed[7, :3]).any()
+
+    values = mock_model.predict_points(np.array([[12.0, 35.0], [33.3, 55.5]]), model)
+    assert np.isnan(values[7, :, 3]).all()
+    assert not np.isnan(np.delete(values[:, :, 3], 7, axis=0)).any()
+
+    mock_model.time, mock_model.quantity, mock_model.ex_model = 7, 3, model
+    assert mock_model.update_contour_figure().data[0].type == "contour"
+    assert len(mock_model.update_animation_figure().frames) == 20
+
+    mock_model.parser.contour_settings = {"mode": "isolines", "levels": 7, "simplify_tolerance": 0.01}
+    assert not [trace for trace in mock_model.update_contour_figure().data if trace.fill == "toself"]
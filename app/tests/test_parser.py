@@ -171,3 +171,114 @@ def test_validate_config_colors_nr(create_config_file, invalid_color_nr_config):
 
     with pytest.raises(ValueError, match="Not enough colors defined."):
         Parser(config_path)
+
+def test_validate_optional_settings(create_config_file, valid_config):
+    """
+    Test that optional settings are filled with defaults and validated.
+    """
+
+    parser = Parser(create_config_file(valid_config, filename="optional_config.yaml"))
+    assert parser.contour_settings == {"mode": "contour", "levels": 7, "simplify_tolerance": 0.01}
+    assert parser.tile_settings["format"] == "png"
+
+    valid_config["tile_settings"] = {"max_zoom": 4}
+    parser = Parser(create_config_file(valid_config, filename="optional_config.yaml"))
+    assert parser.tile_settings["max_zoom"] == 4
+    assert parser.tile_settings["tile_size"] == 256
+
+    valid_config["contour_settings"] = {"mode": "abc"}
+    with pytest.raises(ValueError, match="Invalid contour mode: abc"):
+        Parser(create_config_file(valid_config, filename="optional_config.yaml"))
+
+    valid_config["contour_settings"] = {"mode": "isolines", "levels": 0}
+    with pytest.raises(ValueError, match="Invalid number of contour levels: 0"):
+        Parser(create_config_file(valid_config, filename="optional_config.yaml"))
+
+    valid_config["contour_settings"] = {"mode": "isolines", "simplify_tolerance": -0.1}
+    with pytest.raises(ValueError, match="Invalid simplify tolerance: -0.1"):
+        Parser(create_config_file(valid_config, filename="optional_config.yaml"))
+
+@pytest.mark.parametrize("thread_settings, valid", [
+    ({"blas_threads": 2, "openmp_threads": None, "knn_n_jobs": -1}, True),
+    ({"blas_threads": 0}, False),
+    ({"openmp_threads": "two"}, False),
+    ({"knn_n_jobs": -2}, False)
+])
+def test_validate_thread_settings(create_config_file, valid_config, thread_settings, valid):
+    """
+    Test the validation of thread limits.
+    """
+
+    valid_config["thread_settings"] = thread_settings
+    config_path = create_config_file(valid_config, filename="thread_config.yaml")
+
+    if valid:
+        assert Parser(config_path).thread_settings == thread_settings
+    else:
+        with pytest.raises(ValueError, match="Invalid thread limit"):
+            Parser(config_path)
+
+@pytest.mark.parametrize("graph_settings, valid", [
+    ({"downsampling": "minmax", "points_per_pixel": 2, "default_width": 600}, True),
+    ({"downsampling": "median"}, False),
+    ({"default_width": 0}, False),
+    ({"default_width": "wide"}, False)
+])
+def test_validate_graph_settings(create_config_file, valid_config, graph_settings, valid):
+    """
+    Test the validation of graph settings.
+    """
+
+    valid_config["graph_settings"] = graph_settings
+    config_path = create_config_file(valid_config, filename="graph_config.yaml")
+
+    if valid:
+        assert Parser(config_path).graph_settings == graph_settings
+    else:
+        with pytest.raises(ValueError, match="Invalid"):
+            Parser(config_path)
+
+@pytest.mark.parametrize("compression_settings, valid", [
+    ({"enabled": False, "min_size": 0, "gzip_level": 9, "brotli_quality": 11}, True),
+    ({"enabled": "yes"}, False),
+    ({"min_size": -1}, False),
+    ({"gzip_level": 0}, False),
+    ({"brotli_quality": 12}, False)
+])
+def test_validate_compression_settings(create_config_file, valid_config, compression_settings, valid):
+    """
+    Test the validation of compression settings.
+    """
+
+    valid_config["compression_settings"] = compression_settings
+    config_path = create_config_file(valid_config, filename="compression_config.yaml")
+
+    if valid:
+        assert Parser(config_path).compression_settings == compression_settings
+    else:
+        with pytest.raises(ValueError, match="Invalid"):
+            Parser(config_path)
+
+@pytest.mark.parametrize("dataset_settings, valid", [
+    ({"directory": "data", "run": "2024010100", "memory_budget_mb": 256.5}, True),
+    ({"directory": "data", "run": "sample", "memory_budget_mb": None}, True),
+    ({"memory_budget_mb": "large"}, False),
+    ({"memory_budget_mb": -1}, False),
+    ({"memory_budget_mb": True}, False),
+    ({"run": ""}, False),
+    ({"run": None}, False),
+    ({"directory": 5}, False)
+])
+def test_validate_dataset_settings(create_config_file, valid_config, dataset_settings, valid):
+    """
+    Test the validation of dataset settings.
+    """
+
+    valid_config["dataset_settings"] = dataset_settings
+    config_path = create_config_file(valid_config, filename="dataset_config.yaml")
+
+    if valid:
+        assert Parser(config_path).dataset_settings == dataset_settings
+    else:
+        with pytest.raises(ValueError, match="Invalid"):
+            Parser(config_path)
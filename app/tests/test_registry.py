@@ -0,0 +1,86 @@
+"""
+Module for testing the DatasetRegistry class.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from model.registry import DatasetRegistry
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """
+    Return directory with three runs of 1 MB cubes and one incomplete run.
+    """
+
+    for name in ["run_a", "run_b", "run_c"]:
+        pd.DataFrame({'lon': [10.0, 20.0, 30.0, 40.0], 'lat': [30.0, 40.0, 50.0, 60.0]}).to_csv(
+            tmp_path / f"{name}_stations.csv", index=False
+        )
+        np.save(tmp_path / f"{name}_data.npy", np.random.rand(2 ** 15, 4, 1))
+
+    np.save(tmp_path / "incomplete_data.npy", np.random.rand(2, 4, 1))
+    return tmp_path
+
+
+def test_discover(data_dir):
+    """
+    Test that only runs with both files are discovered.
+    """
+
+    assert DatasetRegistry(str(data_dir)).discover() == ["run_a", "run_b", "run_c"]
+
+def test_open(data_dir):
+    """
+    Test that runs are opened lazily as memory maps and cached.
+    """
+
+    registry = DatasetRegistry(str(data_dir))
+    stations_pos, data = registry.open("run_b")
+
+    assert list(registry.runs) == ["run_b"]
+    assert isinstance(data.base, np.memmap)
+    assert data.shape == (2 ** 15, 4, 1)
+    assert len(stations_pos) == 4
+    assert registry.open("run_b")[1] is data
+
+    with pytest.raises(FileNotFoundError):
+        registry.open("incomplete")
+
+def test_open_precision(data_dir):
+    """
+    Test that runs are converted when stored in other precision.
+    """
+
+    _, data = DatasetRegistry(str(data_dir), precision="float32").open("run_a")
+
+    assert data.dtype == np.float32
+    assert data.base is None
+
+def test_enforce_budget(data_dir):
+    """
+    Test the LRU eviction of runs and their caches under the memory budget.
+    """
+
+    evicted = []
+    caches = {"run_a": 2 ** 19, "run_b": 0, "run_c": 0}
+    registry = DatasetRegistry(
+        str(data_dir),
+        memory_budget=2 * 2 ** 20,
+        on_evict=evicted.append,
+        cache_bytes=lambda name: caches[name]
+    )
+
+    registry.open("run_a")
+    registry.open("run_b")
+    assert registry.enforce_budget(keep="run_b") == ["run_a"]
+    assert evicted == ["run_a"]
+
+    registry.open("run_c")
+    registry.open("run_b")
+    assert registry.enforce_budget(keep="run_b") == []
+
+    registry.memory_budget = 2 ** 20
+    assert registry.enforce_budget(keep="run_c") == ["run_b"]
+    assert list(registry.runs) == ["run_c"]
+    assert registry.memory_usage() == {"run_c": 2 ** 20}
@@ -0,0 +1,83 @@
+"""
+Module for testing the SingleFlight class.
+"""
+
+import threading
+import time
+import pytest
+from model.singleflight import SingleFlight
+
+
+def run_concurrently(function, n_threads):
+    """
+    Run function in n_threads threads started at once and return their results.
+    """
+
+    barrier = threading.Barrier(n_threads)
+    results = [None] * n_threads
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = function()
+        except ValueError as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+def test_do_coalesces():
+    """
+    Test that concurrent identical calls execute once and share the result.
+    """
+
+    flights = SingleFlight()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = run_concurrently(lambda: flights.do(("grid", 1), compute), 8)
+
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"grid": {"executed": 1, "shared": 7}}
+    assert not flights.calls
+
+def test_do_distinct_keys():
+    """
+    Test that different keys and sequential calls are not coalesced.
+    """
+
+    flights = SingleFlight()
+
+    assert flights.do(("grid", 1), lambda: 1) == 1
+    assert flights.do(("grid", 1), lambda: 2) == 2
+    assert flights.do(("regressor", 1), lambda: 3) == 3
+    assert flights.stats() == {"grid": {"executed": 2, "shared": 0}, "regressor": {"executed": 1, "shared": 0}}
+
+def test_do_error():
+    """
+    Test that the error of the computation is raised in all waiting callers.
+    """
+
+    flights = SingleFlight()
+
+    def compute():
+        time.sleep(0.2)
+        raise ValueError("failed")
+
+    results = run_concurrently(lambda: flights.do(("grid", 1), compute), 4)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.do(("grid", 1), lambda: 5) == 5
+
+    with pytest.raises(ValueError):
+        flights.do(("grid", 2), compute)
@@ -0,0 +1,84 @@
+"""
+Module for testing the reduced precision storage.
+"""
+
+import pytest
+import numpy as np
+from model.storage import QuantizedArray, store
+
+@pytest.fixture
+def cube():
+    """
+    Return cube in the format (time, station, quantity) with different ranges of quantities.
+    """
+
+    rng = np.random.default_rng(0)
+    return rng.random((11, 20, 4)) * np.array([30.0, 50.0, 100.0, 0.5]) + np.array([-10.0, 0.0, 0.0, 0.0])
+
+@pytest.mark.parametrize("precision, dtype", [
+    ("float64", np.float64),
+    ("float32", np.float32)
+])
+def test_store_float(cube, precision, dtype):
+    """
+    Test storing in floating point precision.
+    """
+
+    stored = store(cube, precision)
+
+    assert stored.dtype == dtype
+    assert np.allclose(stored, cube, rtol=1e-6)
+
+def test_quantized_array(cube):
+    """
+    Test that int16 storage keeps error below half of the quantization step of every quantity.
+    """
+
+    stored = store(cube, "int16")
+    step = (cube.max(axis=(0, 1)) - cube.min(axis=(0, 1))) / 65534
+
+    assert isinstance(stored, QuantizedArray)
+    assert stored.shape == cube.shape
+    assert stored.nbytes < cube.nbytes / 3
+    assert np.all(np.abs(np.asarray(stored) - cube) <= step * 0.5 + 1e-6 * np.abs(cube))
+
+@pytest.mark.parametrize("key", [
+    (3, slice(None), 2),
+    (slice(None, 5), 7),
+    (slice(None), [[1, 2], [3, 4]], slice(None)),
+    ([0, 4, 9], slice(None), 1),
+    (Ellipsis, 3)
+])
+def test_quantized_array_indexing(cube, key):
+    """
+    Test that indexing of the quantized array matches indexing of the original array.
+    """
+
+    stored = store(cube, "int16")
+
+    assert stored[key].shape == cube[key].shape
+    assert np.allclose(stored[key], cube[key], atol=1e-3)
+
+def test_quantized_array_nan(cube):
+    """
+    Test that missing values survive quantization.
+    """
+
+    cube[2, 3, 1] = np.nan
+    cube[:, :, 3] = np.nan
+    stored = store(cube, "int16")
+
+    assert np.isnan(stored[2, 3, 1])
+    assert np.all(np.isnan(stored[:, :, 3]))
+    assert not np.isnan(stored[2, 4, 1])
+
+def test_quantized_grid():
+    """
+    Test quantization of a plane with a single scale.
+    """
+
+    Z = np.linspace(-5.0, 5.0, 100).reshape(10, 10)
+    stored = store(Z, "int16", per_last_axis=False)
+
+    assert np.asarray(stored.scale).shape == ()
+    assert np.allclose(np.asarray(stored), Z, atol=10.0 / 65534)
@@ -0,0 +1,205 @@
+"""
+Module for testing the TileRenderer class.
+"""
+
+import os
+import threading
+import pytest
+import numpy as np
+import pandas as pd
+from PIL import Image
+from model.model import Model
+from model.tiles import parse_time_key, time_key
+
+@pytest.fixture
+def mock_parser(mock_parser):
+    """
+    Fixture to adjust the shared mock Parser to three quantities shown as raster tiles.
+    """
+
+    mock_parser.quantities = ["Air Temperature", "Ground Temperature", "Air Humidity"]
+    mock_parser.contour_settings = {"mode": "raster", "levels": 7, "simplify_tolerance": 0.01}
+    mock_parser.tile_settings["max_zoom"] = 2
+
+    return mock_parser
+
+@pytest.fixture
+def mock_model(mock_parser):
+    """
+    Fixture to create a mock Model.
+    """
+
+    model = Model()
+    model.stations_pos = pd.DataFrame({
+        'lon': [10.0, 12.0, 14.0, 16.0],
+        'lat': [30.0, 31.0, 32.0, 33.0]
+    })
+    model.data = np.random.rand(5, 4, 3)
+    model.time = 0
+    model.quantity = 0
+    model.station = 0
+    model.ex_model = 0
+    model.parser = mock_parser
+    return model
+
+
+def test_render_pyramid(mock_model):
+    """
+    Test that render_pyramid writes all tiles of all zoom levels.
+    """
+
+    renderer = mock_model.tile_renderer
+
+    assert renderer.render_pyramid(2, 1, 0) == 1 + 4 + 16
+
+    for zoom in range(3):
+        for x in range(2 ** zoom):
+            for y in range(2 ** zoom):
+                path = renderer.tile_path(0, 1, 2, zoom, x, y)
+                assert os.path.exists(path)
+                assert Image.open(path).size == (64, 64)
+
+def test_get_tile_coalescing(mock_model):
+    """
+    Test that concurrent requests for tiles of the same pyramid render it only once and leave no temporary files.
+    """
+
+    renderer = mock_model.tile_renderer
+    write_pyramid = renderer.write_pyramid
+    calls = []
+    renderer.write_pyramid = lambda *args: calls.append(args) or write_pyramid(*args)
+
+    threads = [
+        threading.Thread(target=renderer.get_tile, args=(0, 1, 2, 2, i % 4, i // 4))
+        for i in range(12)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [(2, 1, 0)]
+    assert renderer.render_pyramid(2, 1, 0) == 0
+
+    directory = os.path.dirname(os.path.dirname(renderer.tile_path(0, 1, 2, 2, 0, 0)))
+    files = [name for _, _, names in os.walk(directory) for name in names]
+    assert len(files) == 16
+    assert all(name.endswith(".png") for name in files)
+
+def test_fingerprint(mock_model):
+    """
+    Test that tiles of different parameters of the model are stored apart.
+    """
+
+    renderer = mock_model.tile_renderer
+    fingerprint = renderer.fingerprint(0)
+    path = renderer.tile_path(0, 1, 2, 0, 0, 0)
+
+    assert renderer.fingerprint(1) != fingerprint
+    assert fingerprint in path and fingerprint in renderer.tile_url(0, 1, 2, 0, 0, 0)
+
+    mock_model.parser.knn_model_params = {"n_neighbors": 3, "algorithm": "auto", "weights": "distance"}
+    assert renderer.fingerprint(0) != fingerprint
+    assert renderer.tile_path(0, 1, 2, 0, 0, 0) != path
+
+    mock_model.parser.knn_model_params = {"n_neighbors": 2, "algorithm": "auto", "weights": "distance"}
+    mock_model.parser.storage_settings = {"precision": "float32"}
+    assert renderer.fingerprint(0) != fingerprint
+
+def test_colorize(mock_model):
+    """
+    Test that colorize keeps north up and spans the whole color scheme.
+    """
+
+    Z = np.tile(np.linspace(0.0, 1.0, 10)[:, np.newaxis], (1, 5))
+    image = np.asarray(mock_model.tile_renderer.colorize(Z, 0))
+
+    assert image.shape == (10, 5, 4)
+    assert np.array_equal(image[0, 0], [253, 231, 36, 255])
+    assert np.array_equal(image[-1, 0], [68, 1, 84, 255])
+
+def test_colorize_empty(mock_model):
+    """
+    Test that NaN values of a slice without data are transparent.
+    """
+
+    Z = np.tile(np.linspace(0.0, 1.0, 10)[:, np.newaxis], (1, 5))
+    Z[:, 2] = np.nan
+    image = np.asarray(mock_model.tile_renderer.colorize(Z, 0))
+    assert np.all(image[:, 2, 3] == 0)
+    assert np.array_equal(image[0, 0], [253, 231, 36, 255])
+
+    image = np.asarray(mock_model.tile_renderer.colorize(np.full((4, 4), np.nan), 0))
+    assert np.all(image[:, :, 3] == 0)
+
+def test_get_tile(mock_model):
+    """
+    Test that get_tile renders missing pyramid on demand.
+    """
+
+    renderer = mock_model.tile_renderer
+    path = renderer.tile_path(1, 0, 4, 1, 1, 0)
+
+    assert not os.path.exists(path)
+    assert renderer.get_tile(1, 0, 4, 1, 1, 0) == path
+    assert os.path.exists(path)
+
+@pytest.mark.parametrize("indices, expected", [
+    ((0, 0, 0, 0, 0, 0), True),
+    ((2, 2, 4, 2, 3, 3), True),
+    ((3, 0, 0, 0, 0, 0), False),
+    ((0, 3, 0, 0, 0, 0), False),
+    ((0, 0, 5, 0, 0, 0), False),
+    ((0, 0, 0, 3, 0, 0), False),
+    ((0, 0, 0, 1, 2, 0), False)
+])
+def test_is_valid(mock_model, indices, expected):
+    """
+    Test the validation of tile indices.
+    """
+
+    assert mock_model.tile_renderer.is_valid(*indices) == expected
+
+def test_update_raster_figure(mock_model):
+    """
+    Test that the raster mode covers the plane with tile images instead of Contour trace.
+    """
+
+    fig = mock_model.update_contour_figure()
+    xrange, yrange = mock_model.build_range()
+
+    assert all(trace.type != "contour" for trace in fig.data)
+    assert fig.data[0].marker.showscale
+    assert len(fig.layout.images) == 4
+    assert min(image.x for image in fig.layout.images) == pytest.approx(xrange[0])
+    assert max(image.y for image in fig.layout.images) == pytest.approx(yrange[-1])
+    fingerprint = mock_model.tile_renderer.fingerprint(0)
+    assert fig.layout.images[0].source == f"/tiles/sample/{fingerprint}/0/0/0/1/0/0.png"
+
+@pytest.mark.parametrize("key, expected", [
+    ("3", 3),
+    ("max-1-4", ("max", 1, 4)),
+    ("median-1-4", None),
+    ("max-1", None),
+    ("-1", None)
+])
+def test_parse_time_key(key, expected):
+    """
+    Test parsing of forecast times and aggregation windows from tile URLs.
+    """
+
+    assert parse_time_key(key) == expected
+    if expected is not None:
+        assert time_key(expected) == key
+
+def test_render_pyramid_aggregation(mock_model):
+    """
+    Test rendering of tiles of an aggregated window.
+    """
+
+    renderer = mock_model.tile_renderer
+
+    assert renderer.is_valid(0, 1, ("mean", 0, 4), 0, 0, 0)
+    assert not renderer.is_valid(0, 1, ("mean", 3, 5), 0, 0, 0)
+    assert renderer.render_pyramid(("mean", 0, 4), 1, 0) == 21
+    assert os.path.exists(renderer.tile_path(0, 1, ("mean", 0, 4), 2, 3, 3))
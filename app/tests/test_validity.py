@@ -0,0 +1,75 @@
+"""
+Module for testing the StationValidity class.
+"""
+
+import pytest
+import numpy as np
+from model.validity import StationValidity
+from model.storage import store
+
+@pytest.fixture
+def cube():
+    """
+    Return random cube in the format (time, station, quantity) with two patterns of missing stations.
+    """
+
+    cube = np.random.default_rng(0).random((10, 5, 3))
+    cube[2:4, 1, 0] = np.nan
+    cube[6, 1, 2] = np.nan
+    cube[8, [0, 4], :] = np.nan
+
+    return cube
+
+def test_mask_groups(cube):
+    """
+    Test that slices with the same available stations share one mask.
+    """
+
+    validity = StationValidity(cube, chunk_size=3)
+
+    assert validity.ids.shape == (10, 3)
+    assert len(validity.masks) == 3
+    assert not validity.all_valid
+
+    full = validity.ids[0, 0]
+    assert validity.stations[full] == slice(None)
+    assert validity.ids[2, 0] == validity.ids[3, 0] == validity.ids[6, 2] != full
+    assert np.array_equal(validity.stations[validity.ids[2, 0]], [0, 2, 3, 4])
+    assert np.array_equal(validity.stations[validity.ids[8, 1]], [1, 2, 3])
+    assert np.sum(validity.ids == full) == 30 - 3 - 3
+
+    for time in range(10):
+        for quantity in range(3):
+            assert np.array_equal(validity.masks[validity.ids[time, quantity]], ~np.isnan(cube[time, :, quantity]))
+
+def test_all_valid():
+    """
+    Test the cube without missing values.
+    """
+
+    validity = StationValidity(np.ones((4, 3, 2)))
+
+    assert validity.all_valid
+    assert np.all(validity.ids == 0)
+
+def test_quantized(cube):
+    """
+    Test that missing values are found in the cube stored as int16.
+    """
+
+    validity = StationValidity(store(cube, "int16"))
+
+    assert np.array_equal(validity.ids, StationValidity(cube).ids)
+
+def test_mask_id(cube):
+    """
+    Test lookup of existing masks and adding of new ones.
+    """
+
+    validity = StationValidity(cube)
+
+    assert validity.mask_id(~np.isnan(cube[8, :, 0])) == validity.ids[8, 0]
+    mask_id = validity.mask_id(np.array([True, True, False, False, True]))
+    assert mask_id == 3
+    assert np.array_equal(validity.stations[mask_id], [0, 1, 4])
+    assert validity.mask_id(np.array([True, True, False, False, True])) == mask_id
@@ -5,38 +5,9 @@ Module for testing the View class.
 import pytest
 import pandas as pd
 import numpy as np
-from flexmock import flexmock
 from view.view import View
-from model.parser import Parser
 from model.model import Model
 
-@pytest.fixture
-def mock_parser():
-    """
-    Fixture to create a mock Parser.
-    """
-
-    parser = flexmock(Parser)
-
-    parser.quantities = ["Air Temperature", "Ground Temperature", "Air Humidity", "Wind Direction", "Wind"]
-    parser.graph_colors = ["blue", "red", "black", "gray", "maroon"]
-    parser.contour_color_schemes = ["viridis", "inferno", "magma", "cividis", "plasma"]
-    parser.forecast_settings = {
-        "forecast_range": 5,
-        "forecast_step": 6
-    }
-    parser.default_view = {
-        "quantity": "Air Temperature",
-        "station": 0,
-        "time": 0,
-        "model": 0
-    }
-    parser.knn_model_params = {"n_neighbors": 2, "algorithm": "auto", "weights": "uniform"}
-    parser.svr_model_params = {"C": 1.0, "kernel": "rbf", "gamma": "scale"}
-    parser.gbr_model_params = {"learning_rate": 0.1, "n_estimators": 100, "subsample": 1.0}
-
-    return parser
-
 @pytest.fixture
 def mock_model(mock_parser):
     """
@@ -110,3 +81,15 @@ def test_init_figures(view, mock_model, quantities):
         assert "layout" in fig
         assert len(fig["data"]) > 0
         assert fig["data"][0]["type"] == "scatter"
+
+def test_init_figures_downsampled(view, mock_model):
+    """
+    Test that the initial graphs are downsampled to the default width.
+    """
+
+    mock_model.data = np.random.rand(1000, 4, len(mock_model.parser.quantities))
+    mock_model.parser.forecast_settings = {"forecast_range": 1000, "forecast_step": 6}
+    mock_model.parser.graph_settings = {"downsampling": "lttb", "points_per_pixel": 1, "default_width": 100}
+
+    for fig in view.init_figures():
+        assert len(fig["data"][0]["x"]) == 100
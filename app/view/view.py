@@ -16,9 +16,11 @@ class View:
 
         self.model = model
 
+        self.run_options = []
         self.station_options = []
         self.quantity_options = []
         self.radio_labels = []
+        self.aggregation_options = []
         self.time_labels = {}
 
 
@@ -27,20 +29,27 @@ class View:
         Return generated labels for interactive comopnents.
         """
 
+        self.run_options = [{'label': name, 'value': name} for name in self.model.registry.discover()]
         self.station_options = [{'label': f"Station {idx}", 'value': idx} for idx in self.model.stations_pos.index.tolist()]
         self.quantity_options = [{'label': name, 'value': i} for i, name in enumerate(self.model.parser.quantities)]
-        self.time_labels = {i: f"{i * self.model.parser.forecast_settings['forecast_step']}h" for i in range(self.model.parser.forecast_settings['forecast_range'])}
+        self.time_labels = self.model.time_labels()
         self.radio_labels = [{"label": name, "value": idx} for idx, name in enumerate(["kNN", "SVR", "GBR"])]
+        self.aggregation_options = [
+            {"label": label, "value": value}
+            for label, value in [("Instant", "none"), ("Mean", "mean"), ("Maximum", "max"), ("Minimum", "min"), ("Accumulation", "sum")]
+        ]
 
 
     def init_figures(self):
         """
         Initializes graph figures when the application is first loaded.
+        Series are downsampled to the default width, the real width is known after the first relayout.
         """
 
+        width = self.model.parser.graph_settings["default_width"]
         figs = []
         for i, _ in enumerate(self.model.parser.quantities):
-            figs.append(self.model.update_graph_figure(i))
+            figs.append(self.model.update_graph_figure(i, width=width))
         return figs
 
     def create_layout(self):
@@ -69,7 +78,7 @@ class View:
                                 html.Div(
                                     dcc.Slider(
                                         min=0,
-                                        max=self.model.parser.forecast_settings["forecast_range"] - 1,
+                                        max=self.model.forecast_times() - 1,
                                         step=1, ####
                                         value=self.model.time,
                                         marks=self.time_labels,
@@ -86,6 +95,19 @@ class View:
                             [
                                 html.Div(
                                     [
+                                    html.Div(
+                                        [
+                                            html.P("Select Forecast Run:", className="dropdown-label"),
+                                            dcc.Dropdown(
+                                                options=self.run_options,
+                                                value=self.model.run,
+                                                id="dropdown-run",
+                                                className="dropdown",
+                                                clearable=False
+                                            ),
+                                        ],
+                                        className="dropdown-container"
+                                    ),
                                     html.Div(
                                         [
                                             html.P("Select Quantity:", className="dropdown-label"),
@@ -124,6 +146,40 @@ class View:
                                             ),
                                         ],
                                         className="radio-container"
+                                    ),
+                                    html.Div(
+                                        [
+                                            html.P("Aggregate over Forecast Window:", className="dropdown-label"),
+                                            dcc.Dropdown(
+                                                options=self.aggregation_options,
+                                                value="none",
+                                                id="dropdown-aggregation",
+                                                className="dropdown",
+                                                clearable=False
+                                            ),
+                                            dcc.RangeSlider(
+                                                min=0,
+                                                max=self.model.forecast_times() - 1,
+                                                step=1,
+                                                value=list(self.model.window),
+                                                marks=self.time_labels,
+                                                id="slider-window",
+                                                className="slider",
+                                            ),
+                                        ],
+                                        className="dropdown-container"
+                                    ),
+                                    html.Div(
+                                        [
+                                            html.P("Playback:", className="checklist-label"),
+                                            dcc.Checklist(
+                                                options=[{"label": "Animate forecast", "value": "animate"}],
+                                                value=[],
+                                                id="checklist-playback",
+                                                className="checklist",
+                                            ),
+                                        ],
+                                        className="checklist-container"
                                     )
                                     ],
                                     className="top-control-panel-container"
@@ -148,8 +204,10 @@ class View:
                         )
                         for i, quantity in enumerate(self.model.parser.quantities)
                     ],
+                    id="bottom-content-container",
                     className="bottom-content-container"
-                )
+                ),
+                dcc.Store(id="store-graph-width")
             ],
             className="body-container"
         )